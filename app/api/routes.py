@@ -1,23 +1,183 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable
+from datetime import datetime
+from typing import TypeVar
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_session
+from app.db.session import get_session_factory
 from app.schemas.generate import GenerateSequenceRequest, GenerateSequenceResponse
+from app.schemas.search import MessageSearchResponse
+from app.services.admission import BULK, INTERACTIVE, Overloaded, admission
+from app.services.deadline import Deadline, DeadlineExceeded
+from app.services.export import EXPORT_FORMATS, MEDIA_TYPES, SequenceExportService
 from app.services.generate import GenerateSequenceService
+from app.services.search import MessageSearchService
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["api"], default_response_class=ORJSONResponse)
+
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+class ClientDisconnected(Exception):
+    pass
+
 
-router = APIRouter(prefix="/api", tags=["api"])
+async def cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """Await `work`, cancelling it if the client goes away before it finishes."""
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def request_deadline(
+    body: GenerateSequenceRequest,
+    x_request_timeout: float | None = Header(None, gt=0, description="End-to-end deadline in seconds"),
+) -> Deadline:
+    """The request's end-to-end deadline, started before admission so queue time counts."""
+    return Deadline.for_request(x_request_timeout, body.timeout_seconds)
+
+
+async def admit_generation(
+    x_priority: str = Header(INTERACTIVE, pattern=f"^({INTERACTIVE}|{BULK})$", description="Admission lane"),
+    deadline: Deadline = Depends(request_deadline),
+):
+    """
+    Hold an admission slot for the request; 503 + Retry-After when overloaded, 504 when the
+    request's deadline runs out while it is queued.
+    """
+    try:
+        await admission.acquire(x_priority, timeout=deadline.remaining())
+    except Overloaded as e:
+        if deadline.expired:
+            raise HTTPException(status_code=504, detail=str(DeadlineExceeded("admission")))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    started = time.monotonic()
+    try:
+        yield x_priority
+    finally:
+        admission.release(x_priority, time.monotonic() - started)
 
 
 @router.post("/generate-sequence", response_model=GenerateSequenceResponse)
 async def generate_sequence(
     body: GenerateSequenceRequest,
+    request: Request,
+    deadline: Deadline = Depends(request_deadline),
+    _lane: str = Depends(admit_generation),  # before get_session: no pool checkout while queued
     session: AsyncSession = Depends(get_session),
 ) -> GenerateSequenceResponse:
-    """Generate a personalized messaging sequence for a LinkedIn prospect."""
+    """
+    Generate a personalized messaging sequence for a LinkedIn prospect.
+    The work is cancelled (provider calls included, nothing persisted) if the deadline
+    expires (504) or the client disconnects. Time spent queued for admission counts
+    against the deadline.
+    """
     try:
         service = GenerateSequenceService(session)
-        return await service.run(body)
+        return await cancel_on_disconnect(request, service.run(body, deadline))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected:
+        # Nobody is listening; 499 (nginx's "client closed request") only shows in logs.
+        raise HTTPException(status_code=499, detail="Client disconnected")
     except Exception as e:
         raise HTTPException(status_code=500, detail="Sequence generation failed. Please try again.") from e
+
+
+@router.get("/search/messages", response_model=MessageSearchResponse)
+async def search_messages(
+    q: str = Query(..., min_length=2, max_length=200, description="Words or phrase, e.g. SOC2 or \"security review\""),
+    prospect_id: str | None = None,
+    prospect_url: str | None = None,
+    created_from: datetime | None = Query(None, description="Sequences created at or after (ISO 8601)"),
+    created_to: datetime | None = Query(None, description="Sequences created before (ISO 8601)"),
+    min_confidence: float | None = Query(None, ge=0, le=1),
+    max_confidence: float | None = Query(None, ge=0, le=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10_000),
+    session: AsyncSession = Depends(get_session),
+) -> MessageSearchResponse:
+    """Search previously generated messages by content and company context, best matches first."""
+    try:
+        service = MessageSearchService(session)
+        return await service.search(
+            q,
+            prospect_id=prospect_id,
+            prospect_url=prospect_url,
+            created_from=created_from,
+            created_to=created_to,
+            min_confidence=min_confidence,
+            max_confidence=max_confidence,
+            limit=limit,
+            offset=offset,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Search failed. Please try again.") from e
+
+
+async def _export_chunks(fmt: str, **filters) -> AsyncIterator[bytes]:
+    # Own session rather than Depends(get_session): FastAPI closes yield dependencies
+    # before a StreamingResponse body is sent, and the cursor must outlive the handler.
+    async with get_session_factory()() as session:
+        async for chunk in SequenceExportService(session).stream(fmt, **filters):
+            yield chunk
+
+
+async def _prepend(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield first
+    try:
+        async for chunk in rest:
+            yield chunk
+    except Exception:
+        # Headers are already sent; the client sees a truncated body.
+        logger.exception("Export failed mid-stream")
+        raise
+
+
+@router.get("/export/sequences")
+async def export_sequences(
+    fmt: str = Query("ndjson", alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    created_from: datetime | None = Query(None, description="Sequences created at or after (ISO 8601)"),
+    created_to: datetime | None = Query(None, description="Sequences created before (ISO 8601)"),
+    prospect_id: str | None = None,
+    prospect_url: str | None = None,
+) -> StreamingResponse:
+    """
+    Stream sequences with their messages and AI usage as NDJSON (one sequence per line) or
+    CSV (one message per row), read through a server-side cursor in constant memory.
+    """
+    chunks = _export_chunks(
+        fmt, created_from=created_from, created_to=created_to, prospect_id=prospect_id, prospect_url=prospect_url
+    )
+    # Run the query before committing to a 200, so a failure to start is still a 500.
+    try:
+        first = await anext(chunks, b"")
+    except Exception as e:
+        await chunks.aclose()
+        raise HTTPException(status_code=500, detail="Export failed. Please try again.") from e
+    return StreamingResponse(
+        _prepend(first, chunks),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="sequences.{fmt}"'},
+    )
@@ -1,3 +1,4 @@
-from .session import get_engine, get_session, init_db
+from .schema import SchemaMismatch, check_schema
+from .session import get_engine, get_session
 
-__all__ = ["get_engine", "get_session", "init_db"]
+__all__ = ["get_engine", "get_session", "check_schema", "SchemaMismatch"]
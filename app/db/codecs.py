@@ -0,0 +1,60 @@
+"""
+orjson codecs for JSON/JSONB columns on asyncpg connections.
+
+By default SQLAlchemy's asyncpg dialect serializes with stdlib json to a str and encodes
+that to bytes in the asyncpg codec. On the way back it decodes the bytes to a str and then
+runs json.loads. Here orjson works on bytes in both directions: the engine's
+json_serializer returns bytes, and the codecs registered below prefix or strip the jsonb
+version byte and hand those bytes straight to orjson.
+"""
+from typing import Any
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# First byte of jsonb in binary format (the jsonb format version).
+JSONB_VERSION = b"\x01"
+
+
+def dumps(value: Any) -> bytes:
+    """Engine json_serializer. Non-str keys are coerced like json.dumps does."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _as_bytes(value: bytes | str) -> bytes:
+    # Pre-serialized str values (e.g. literal JSON text) pass through as UTF-8.
+    return value.encode() if isinstance(value, str) else value
+
+
+def _encode_json(value: bytes | str) -> bytes:
+    return _as_bytes(value)
+
+
+def _decode_json(data: bytes) -> Any:
+    return orjson.loads(data)
+
+
+def _encode_jsonb(value: bytes | str) -> bytes:
+    return JSONB_VERSION + _as_bytes(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return orjson.loads(memoryview(data)[1:])
+
+
+def register_orjson_codecs(engine: AsyncEngine) -> None:
+    """Replace the dialect's stdlib-json codecs on every new connection of `engine`."""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_codecs(dbapi_connection, connection_record) -> None:
+        # Runs after the dialect's own on_connect codec setup, so these override it.
+        # dbapi_connection is SQLAlchemy's adapter; _connection is the asyncpg connection.
+        conn = dbapi_connection._connection
+        for name, encoder, decoder in (
+            ("json", _encode_json, _decode_json),
+            ("jsonb", _encode_jsonb, _decode_jsonb),
+        ):
+            dbapi_connection.await_(
+                conn.set_type_codec(name, encoder=encoder, decoder=decoder, schema="pg_catalog", format="binary")
+            )
@@ -0,0 +1,229 @@
+"""
+Monthly range partitions for the sequence tables, plus the archival job.
+
+message_sequences is partitioned on created_at; sequence_messages and ai_generations are
+partitioned on their parent's created_at (sequence_created_at), so all three tables share
+the same monthly bounds and partition names (<table>_yYYYYmMM).
+
+Archival detaches every partition older than settings.partition_hot_months, moves it to
+settings.archive_schema, drops its search (GIN) indexes and rewrites the bulky reasoning
+columns with settings.archive_compression. Hot partitions are never touched.
+
+Run as a job (e.g. a daily cron):
+    python -m app.db.partitions ensure
+    python -m app.db.partitions archive [--hot-months 6] [--dry-run]
+"""
+import argparse
+import asyncio
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+
+PARENT_TABLE = "message_sequences"
+# Tables partitioned on the parent's created_at; detached before the parent's partition.
+CHILD_TABLES = ("sequence_messages", "ai_generations")
+PARTITIONED_TABLES = (PARENT_TABLE, *CHILD_TABLES)
+
+# Columns rewritten with archive compression once a partition is cold: column -> (type,
+# USING expression). The expression must not be a plain column reference, otherwise
+# PostgreSQL skips the rewrite.
+ARCHIVE_COMPRESSED_COLUMNS = {
+    "sequence_messages": {"thinking_process": ("jsonb", "thinking_process::text::jsonb")},
+}
+
+_PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+@dataclass(frozen=True)
+class ArchivedMonth:
+    month: date
+    tables: list[str]
+
+
+def _q(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + (month.month - 1) + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+async def create_month_partitions(conn: AsyncConnection, month: date) -> None:
+    """Create the partitions for one month in every partitioned table (idempotent)."""
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    for table in PARTITIONED_TABLES:
+        await conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {_q(partition_name(table, month))} "
+                f"PARTITION OF {_q(table)} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+        )
+
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    months_ahead: int | None = None,
+    now: datetime | None = None,
+) -> None:
+    """Make sure the current month and the next `months_ahead` months have partitions."""
+    months_ahead = settings.partition_premake_months if months_ahead is None else months_ahead
+    current = month_start(now or datetime.now(timezone.utc))
+    for offset in range(months_ahead + 1):
+        await create_month_partitions(conn, add_months(current, offset))
+
+
+async def list_partition_months(conn: AsyncConnection, table: str = PARENT_TABLE) -> list[date]:
+    """Months that currently have an attached partition of `table`, oldest first."""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table},
+    )
+    months = []
+    for (relname,) in result:
+        match = _PARTITION_SUFFIX.search(relname)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def _detach_to_archive(conn: AsyncConnection, table: str, month: date) -> str | None:
+    name = partition_name(table, month)
+    exists = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+    if not exists:
+        return None
+    await conn.execute(text(f"ALTER TABLE {_q(table)} DETACH PARTITION {_q(name)}"))
+    # A detached partition keeps standalone copies of the table's FKs. On the children
+    # (to message_sequences) they would block detaching the parent's partition for the
+    # same month. On message_sequences the ON DELETE CASCADE to prospects would let a
+    # prospect delete remove archived sequences but not their (FK-less) archived messages
+    # and ai_generations. The archive is therefore FK-free; deletes do not reach it.
+    result = await conn.execute(
+        text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'"),
+        {"name": name},
+    )
+    for (conname,) in result.all():
+        await conn.execute(text(f"ALTER TABLE {_q(name)} DROP CONSTRAINT {_q(conname)}"))
+    await conn.execute(text(f"ALTER TABLE {_q(name)} SET SCHEMA {_q(settings.archive_schema)}"))
+    return f"{settings.archive_schema}.{name}"
+
+
+async def _strip_search_indexes(conn: AsyncConnection, table: str, month: date) -> None:
+    # Detached months are no longer reachable by the search endpoint, so their GIN indexes
+    # (tsvector and trigram) only cost space. The generated content_tsv column stays: the
+    # partition must keep the parent's columns to be re-attached, and ATTACH PARTITION
+    # rebuilds the missing indexes from the parent's definitions.
+    name = partition_name(table, month)
+    result = await conn.execute(
+        text(
+            "SELECT indexname FROM pg_indexes "
+            "WHERE schemaname = :schema AND tablename = :name AND indexdef LIKE '% USING gin %'"
+        ),
+        {"schema": settings.archive_schema, "name": name},
+    )
+    for (indexname,) in result.all():
+        await conn.execute(text(f"DROP INDEX {_q(settings.archive_schema)}.{_q(indexname)}"))
+
+
+async def _compress_archived(conn: AsyncConnection, table: str, month: date) -> None:
+    columns = ARCHIVE_COMPRESSED_COLUMNS.get(table)
+    if not columns:
+        return
+    qualified = f"{_q(settings.archive_schema)}.{_q(partition_name(table, month))}"
+    method = settings.archive_compression
+    # SET COMPRESSION only applies to newly written values; the USING cast forces a
+    # table rewrite, so existing values are recompressed with the archive method.
+    clauses = []
+    for column, (sql_type, expression) in columns.items():
+        clauses.append(f"ALTER COLUMN {_q(column)} SET COMPRESSION {method}")
+        clauses.append(f"ALTER COLUMN {_q(column)} TYPE {sql_type} USING {expression}")
+    await conn.execute(text(f"ALTER TABLE {qualified} " + ", ".join(clauses)))
+
+
+async def archive_partitions(
+    engine,
+    hot_months: int | None = None,
+    now: datetime | None = None,
+    dry_run: bool = False,
+) -> list[ArchivedMonth]:
+    """
+    Detach and archive every month older than the hot window.
+    Each month is detached in its own short transaction (the only step that locks the
+    live tables); recompression runs afterwards and only locks the archived tables.
+    """
+    hot_months = settings.partition_hot_months if hot_months is None else hot_months
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -hot_months)
+
+    async with engine.connect() as conn:
+        months = [m for m in await list_partition_months(conn) if m < cutoff]
+    if dry_run:
+        return [ArchivedMonth(month=m, tables=[partition_name(t, m) for t in PARTITIONED_TABLES]) for m in months]
+
+    archived = []
+    for month in months:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {_q(settings.archive_schema)}"))
+            moved = {}
+            for table in (*CHILD_TABLES, PARENT_TABLE):
+                archived_name = await _detach_to_archive(conn, table, month)
+                if archived_name:
+                    moved[table] = archived_name
+        async with engine.begin() as conn:
+            for table in moved:
+                await _strip_search_indexes(conn, table, month)
+                await _compress_archived(conn, table, month)
+        archived.append(ArchivedMonth(month=month, tables=list(moved.values())))
+    return archived
+
+
+async def _main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.db.partitions", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    ensure = sub.add_parser("ensure", help="create partitions for the current and upcoming months")
+    ensure.add_argument("--months-ahead", type=int, default=None)
+    archive = sub.add_parser("archive", help="detach, move and compress partitions past the hot window")
+    archive.add_argument("--hot-months", type=int, default=None)
+    archive.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    from app.db.session import get_engine
+
+    engine = get_engine()
+    try:
+        if args.command == "ensure":
+            async with engine.begin() as conn:
+                await ensure_partitions(conn, months_ahead=args.months_ahead)
+            print("✓ Partitions ensured")
+        else:
+            archived = await archive_partitions(engine, hot_months=args.hot_months, dry_run=args.dry_run)
+            verb = "Would archive" if args.dry_run else "Archived"
+            for item in archived:
+                print(f"{verb} {item.month:%Y-%m}: {', '.join(item.tables)}")
+            if not archived:
+                print("Nothing to archive")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,53 @@
+"""
+Schema version check at startup.
+
+The schema is owned by Alembic (migrations/). Migrations run out of band, e.g.
+`alembic upgrade head` as a release step; an app process only verifies that the database
+is at the revision its code expects, which is one catalog lookup and one tiny SELECT.
+"""
+import asyncio
+from functools import lru_cache
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.partitions import ensure_partitions
+from app.db.session import get_engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+
+class SchemaMismatch(RuntimeError):
+    """The database is not at the Alembic head revision this code was written for."""
+
+
+@lru_cache(maxsize=1)
+def expected_revision() -> str:
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory(str(MIGRATIONS_DIR)).get_current_head()
+
+
+async def current_revision(conn: AsyncConnection) -> str | None:
+    if not await conn.scalar(text("SELECT to_regclass('alembic_version') IS NOT NULL")):
+        return None
+    return await conn.scalar(text("SELECT version_num FROM alembic_version"))
+
+
+async def check_schema() -> str:
+    """
+    Return the database revision if it matches the code, else raise SchemaMismatch.
+    Also makes sure the current and upcoming monthly partitions exist (a no-op catalog
+    check once the partition job has created them).
+    """
+    expected = await asyncio.to_thread(expected_revision)
+    async with get_engine().begin() as conn:
+        current = await current_revision(conn)
+        if current != expected:
+            raise SchemaMismatch(
+                f"Database schema is at revision {current or '<none>'}, expected {expected}. "
+                "Run `alembic upgrade head`."
+            )
+        await ensure_partitions(conn)
+    return current
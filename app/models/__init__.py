@@ -1,6 +1,15 @@
 from .prospect import Prospect
 from .tov_config import TovConfig
+from .company_context import CompanyContext, context_hash
 from .sequence import MessageSequence, SequenceMessage
 from .ai_generation import AIGeneration
 
-__all__ = ["Prospect", "TovConfig", "MessageSequence", "SequenceMessage", "AIGeneration"]
+__all__ = [
+    "Prospect",
+    "TovConfig",
+    "CompanyContext",
+    "context_hash",
+    "MessageSequence",
+    "SequenceMessage",
+    "AIGeneration",
+]
@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import DateTime, Float, ForeignKeyConstraint, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -12,13 +13,28 @@ def gen_uuid():
 
 class AIGeneration(Base):
     __tablename__ = "ai_generations"
+    # Partitioned like sequence_messages: on the owning sequence's created_at, so the
+    # archival job detaches all three tables for a month with the same bounds.
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["sequence_id", "sequence_created_at"],
+            ["message_sequences.id", "message_sequences.created_at"],
+            ondelete="CASCADE",
+        ),
+        Index("ix_ai_generations_sequence", "sequence_id"),
+        {"postgresql_partition_by": "RANGE (sequence_created_at)"},
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=gen_uuid)
-    sequence_id: Mapped[str] = mapped_column(String(36), ForeignKey("message_sequences.id", ondelete="CASCADE"), nullable=False)
+    sequence_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    sequence_created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
     model_used: Mapped[str] = mapped_column(String(64), nullable=False)
     input_tokens: Mapped[int] = mapped_column(Integer, nullable=False)
     output_tokens: Mapped[int] = mapped_column(Integer, nullable=False)
     cost_estimate: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Per stage (analysis / planning / generation): provider, model, calls, input_tokens,
+    # output_tokens, cost_estimate. The columns above are the totals across stages.
+    stage_usage: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     sequence = relationship("MessageSequence", back_populates="ai_generations")
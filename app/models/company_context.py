@@ -0,0 +1,37 @@
+import hashlib
+from datetime import datetime
+from sqlalchemy import Computed, DateTime, Index, String, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+
+
+def context_hash(content: str) -> str:
+    """Content address of a company context: hex SHA-256 of its UTF-8 bytes."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class CompanyContext(Base):
+    """Deduplicated company context text; sequences reference it by content hash."""
+
+    __tablename__ = "company_contexts"
+    __table_args__ = (
+        Index("ix_company_contexts_content_tsv", "content_tsv", postgresql_using="gin"),
+        Index(
+            "ix_company_contexts_content_trgm",
+            "content",
+            postgresql_using="gin",
+            postgresql_ops={"content": "gin_trgm_ops"},
+        ),
+    )
+    __mapper_args__ = {"eager_defaults": False}
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)  # context_hash(content)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    content_tsv: Mapped[str] = mapped_column(
+        TSVECTOR, Computed("to_tsvector('english', content)", persisted=True), deferred=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+    sequences = relationship("MessageSequence", back_populates="context")
@@ -1,7 +1,18 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import (
+    Computed,
+    DateTime,
+    Float,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -13,28 +24,58 @@ def gen_uuid():
 
 class MessageSequence(Base):
     __tablename__ = "message_sequences"
-    __table_args__ = (Index("ix_message_sequences_prospect_created", "prospect_id", "created_at"),)
+    # Monthly RANGE partitions on created_at (see app/db/partitions.py); the partition key
+    # has to be part of the primary key, so children reference (id, created_at).
+    __table_args__ = (
+        Index("ix_message_sequences_prospect_created", "prospect_id", "created_at"),
+        Index("ix_message_sequences_context_created", "context_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=gen_uuid)
     prospect_id: Mapped[str] = mapped_column(String(36), ForeignKey("prospects.id", ondelete="CASCADE"), nullable=False)
     tov_config: Mapped[dict] = mapped_column(JSONB, nullable=False)  # snapshot: formality, warmth, directness
-    company_context: Mapped[str] = mapped_column(Text, nullable=False)
+    context_id: Mapped[str] = mapped_column(String(64), ForeignKey("company_contexts.id"), nullable=False)
     sequence_length: Mapped[int] = mapped_column(Integer, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, default=datetime.utcnow)
 
     prospect = relationship("Prospect", back_populates="sequences")
+    context = relationship("CompanyContext", back_populates="sequences")
     messages = relationship("SequenceMessage", back_populates="sequence", order_by="SequenceMessage.step_number")
     ai_generations = relationship("AIGeneration", back_populates="sequence")
 
 
 class SequenceMessage(Base):
     __tablename__ = "sequence_messages"
-    __table_args__ = (UniqueConstraint("sequence_id", "step_number", name="uq_sequence_message_step"),)
+    # Partitioned on the parent's created_at so a month of sequences and its messages
+    # live in partitions with identical bounds and can be detached together.
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["sequence_id", "sequence_created_at"],
+            ["message_sequences.id", "message_sequences.created_at"],
+            ondelete="CASCADE",
+        ),
+        UniqueConstraint("sequence_id", "sequence_created_at", "step_number", name="uq_sequence_message_step"),
+        Index("ix_sequence_messages_content_tsv", "content_tsv", postgresql_using="gin"),
+        Index(
+            "ix_sequence_messages_content_trgm",
+            "content",
+            postgresql_using="gin",
+            postgresql_ops={"content": "gin_trgm_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (sequence_created_at)"},
+    )
+    # Search vector is generated by PostgreSQL; don't fetch it back on every insert.
+    __mapper_args__ = {"eager_defaults": False}
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=gen_uuid)
-    sequence_id: Mapped[str] = mapped_column(String(36), ForeignKey("message_sequences.id", ondelete="CASCADE"), nullable=False)
+    sequence_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    sequence_created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
     step_number: Mapped[int] = mapped_column(Integer, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    content_tsv: Mapped[str] = mapped_column(
+        TSVECTOR, Computed("to_tsvector('english', content)", persisted=True), deferred=True
+    )
     thinking_process: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     confidence_score: Mapped[float | None] = mapped_column(Float, nullable=True)
 
@@ -1,4 +1,15 @@
 from .tov import tov_to_instructions
-from .templates import PROFILE_ANALYSIS_PROMPT, SEQUENCE_GENERATION_PROMPT
+from .templates import (
+    PROFILE_ANALYSIS_PROMPT,
+    SEQUENCE_GENERATION_PROMPT,
+    SEQUENCE_PLAN_PROMPT,
+    SEQUENCE_STEP_PROMPT,
+)
 
-__all__ = ["tov_to_instructions", "PROFILE_ANALYSIS_PROMPT", "SEQUENCE_GENERATION_PROMPT"]
+__all__ = [
+    "tov_to_instructions",
+    "PROFILE_ANALYSIS_PROMPT",
+    "SEQUENCE_GENERATION_PROMPT",
+    "SEQUENCE_PLAN_PROMPT",
+    "SEQUENCE_STEP_PROMPT",
+]
@@ -48,3 +48,63 @@ Respond with a JSON object only, no markdown, with this exact structure:
 }}
 
 Ensure "messages" has exactly {sequence_length} items. Keep each message under 300 characters for connection requests and under 500 for follow-ups."""
+
+# Parallel generation (long sequences): one short planning call, then one call per step.
+SEQUENCE_PLAN_PROMPT = """You are planning a personalized LinkedIn outreach sequence for a sales rep.
+
+## Prospect analysis
+{prospect_analysis}
+
+## Company context
+{company_context}
+
+## Tone of voice
+{tov_instructions}
+
+## Task
+Plan a sequence of exactly {sequence_length} messages (connection request first, then follow-ups). Do not write the messages. For each step give its purpose and the angle it takes, so that the steps build on each other without repeating.
+
+Respond with a JSON object only, no markdown, with this exact structure:
+{{
+  "thinking_summary": "One paragraph summarizing your overall approach to this sequence.",
+  "steps": [
+    {{
+      "step": 1,
+      "purpose": "e.g. connection request",
+      "angle": "One sentence: the hook or value point this message uses."
+    }}
+  ]
+}}
+
+Ensure "steps" has exactly {sequence_length} items. Keep every field short."""
+
+SEQUENCE_STEP_PROMPT = """You are writing one message of a personalized LinkedIn outreach sequence for a sales rep.
+
+## Prospect analysis
+{prospect_analysis}
+
+## Company context
+{company_context}
+
+## Tone of voice
+{tov_instructions}
+
+## Sequence plan
+{sequence_plan}
+
+## Task
+Write only step {step} of {sequence_length}: {purpose}. Angle: {angle}
+It must fit the plan: do not reuse the hooks of the other steps. Keep it under {max_chars} characters.
+
+Provide:
+1. Your reasoning (thinking process) in 1-2 sentences: why this angle, why this length, what you're optimizing for.
+2. The actual message text (what the rep would send).
+3. A confidence score from 0 to 1 for how well this message fits the prospect and TOV.
+
+Respond with a JSON object only, no markdown, with this exact structure:
+{{
+  "step": {step},
+  "thinking_process": "Your reasoning for this message.",
+  "content": "The exact message text.",
+  "confidence_score": 0.85
+}}"""
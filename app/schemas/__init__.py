@@ -5,6 +5,7 @@ from .generate import (
     MessageOutput,
     ProspectAnalysisOutput,
 )
+from .search import MessageSearchResponse, MessageSearchResult
 
 __all__ = [
     "GenerateSequenceRequest",
@@ -12,4 +13,6 @@ __all__ = [
     "TovConfigIn",
     "MessageOutput",
     "ProspectAnalysisOutput",
+    "MessageSearchResponse",
+    "MessageSearchResult",
 ]
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
@@ -23,6 +25,13 @@ class GenerateSequenceRequest(BaseModel):
     tov_config: TovConfigIn = Field(default_factory=TovConfigIn)
     company_context: str = Field(..., min_length=1, max_length=2000)
     sequence_length: int = Field(3, ge=1, le=10)
+    timeout_seconds: float | None = Field(
+        None, gt=0, le=300, description="End-to-end deadline; the X-Request-Timeout header is also accepted"
+    )
+    models: dict[Literal["analysis", "planning", "generation"], str] | None = Field(
+        None,
+        description='Per-stage model override, e.g. {"generation": "openai:gpt-4o"}; must be a priced model',
+    )
 
     @field_validator("prospect_url")
     @classmethod
@@ -53,6 +62,7 @@ class GenerateSequenceResponse(BaseModel):
     model_config = ConfigDict(protected_namespaces=())
     
     sequence_id: str
+    context_id: str | None = None  # stable hash of company_context, shared by identical contexts
     prospect_analysis: ProspectAnalysisOutput
     messages: list[MessageOutput]
     thinking_process_summary: str | None = None
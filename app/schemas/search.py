@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class MessageSearchResult(BaseModel):
+    message_id: str
+    sequence_id: str
+    prospect_id: str
+    prospect_url: str
+    step: int
+    content: str
+    highlight: str | None = None
+    confidence_score: float | None = None
+    created_at: datetime
+    rank: float
+
+
+class MessageSearchResponse(BaseModel):
+    query: str
+    results: list[MessageSearchResult] = Field(default_factory=list)
+    limit: int
+    offset: int
+    has_more: bool = False
@@ -0,0 +1,129 @@
+"""
+Admission control for generation requests: a bounded number in flight, bounded per-lane
+queues, and priority lanes.
+
+- interactive: UI traffic. Admitted first whenever a slot frees up.
+- bulk: batch / CRM-sync traffic. Never holds more than bulk_max_in_flight slots, so
+  some capacity is always left for interactive requests.
+
+When a lane's queue is full, or a request waits longer than the queue timeout (or its own
+deadline, if shorter), the request is rejected with Overloaded (HTTP 503 + Retry-After) instead of piling up until provider
+calls and DB pool checkouts time out for everyone.
+"""
+import asyncio
+import math
+from collections import deque
+
+from app.config import settings
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)  # wake-up order
+
+
+class Overloaded(Exception):
+    def __init__(self, lane: str, reason: str, retry_after: int) -> None:
+        super().__init__(f"Server overloaded ({lane} {reason}); retry after {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int,
+        bulk_max_in_flight: int,
+        max_queue: dict[str, int],
+        queue_timeout: float,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.bulk_max_in_flight = min(bulk_max_in_flight, max_in_flight)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = {lane: 0 for lane in PRIORITIES}
+        self._waiters: dict[str, deque[asyncio.Future]] = {lane: deque() for lane in PRIORITIES}
+        # Moving average of how long an admitted request holds its slot, for Retry-After.
+        self._avg_hold_seconds = 5.0
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        return cls(
+            max_in_flight=settings.admission_max_in_flight,
+            bulk_max_in_flight=settings.admission_bulk_max_in_flight,
+            max_queue={
+                INTERACTIVE: settings.admission_max_queue_interactive,
+                BULK: settings.admission_max_queue_bulk,
+            },
+            queue_timeout=settings.admission_queue_timeout_seconds,
+        )
+
+    @property
+    def total_in_flight(self) -> int:
+        return sum(self.in_flight.values())
+
+    def queued(self, lane: str) -> int:
+        return len(self._waiters[lane])
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": dict(self.in_flight),
+            "queued": {lane: self.queued(lane) for lane in PRIORITIES},
+            "max_in_flight": self.max_in_flight,
+        }
+
+    def _has_slot(self, lane: str) -> bool:
+        if self.total_in_flight >= self.max_in_flight:
+            return False
+        return lane != BULK or self.in_flight[BULK] < self.bulk_max_in_flight
+
+    def _retry_after(self, lane: str) -> int:
+        backlog = self.queued(INTERACTIVE) + (self.queued(BULK) if lane == BULK else 0)
+        waves = (backlog + 1) / self.max_in_flight
+        return max(1, math.ceil(self._avg_hold_seconds * waves))
+
+    def _wake(self) -> None:
+        for lane in PRIORITIES:
+            waiters = self._waiters[lane]
+            while waiters and self._has_slot(lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.in_flight[lane] += 1
+                    waiter.set_result(None)
+
+    async def acquire(self, lane: str, timeout: float | None = None) -> None:
+        """Take a slot in `lane`, waiting at most the queue timeout or `timeout` if shorter."""
+        if lane == BULK and self.bulk_max_in_flight == 0:
+            # The lane is turned off; no slot will ever free up for it, so don't queue.
+            raise Overloaded(lane, "lane disabled", self._retry_after(lane))
+        # Queue-jumping is not allowed: a free slot goes to an already waiting request first.
+        if self._has_slot(lane) and not any(self._waiters[p] for p in PRIORITIES[: PRIORITIES.index(lane) + 1]):
+            self.in_flight[lane] += 1
+            return
+        if self.queued(lane) >= self.max_queue[lane]:
+            raise Overloaded(lane, "queue full", self._retry_after(lane))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout if timeout is None else min(self.queue_timeout, timeout))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted in the same tick we gave up: hand the slot back.
+                self.release(lane)
+            else:
+                try:
+                    self._waiters[lane].remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise Overloaded(lane, "queue wait timed out", self._retry_after(lane)) from None
+            raise
+
+    def release(self, lane: str, held_seconds: float | None = None) -> None:
+        self.in_flight[lane] -= 1
+        if held_seconds is not None:
+            self._avg_hold_seconds = 0.9 * self._avg_hold_seconds + 0.1 * held_seconds
+        self._wake()
+
+
+admission = AdmissionController.from_settings()
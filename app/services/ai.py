@@ -1,56 +1,140 @@
 """
 AI service: profile analysis and sequence generation with token tracking and error handling.
-Supports both OpenAI and Groq (free tier).
+Supports both OpenAI and Groq (free tier); each stage (analysis, planning, generation) is
+routed to its own provider/model, see resolve_routes.
+
+The provider SDKs are imported on first use, not at module load: importing openai alone
+takes ~0.5s, and a process only needs the providers its stages are routed to.
 """
+import asyncio
 import json
 import logging
-from typing import Any
-
-from openai import AsyncOpenAI
-from openai import APIError as OpenAIAPIError
+import sys
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
-try:
-    from groq import AsyncGroq
-    from groq import APIError as GroqAPIError
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
-    GroqAPIError = Exception
+import orjson
 
-from app.config import settings
+from app.config import AI_PROVIDERS, settings
 from app.prompts import tov_to_instructions
-from app.prompts.templates import PROFILE_ANALYSIS_PROMPT, SEQUENCE_GENERATION_PROMPT
+from app.prompts.templates import (
+    PROFILE_ANALYSIS_PROMPT,
+    SEQUENCE_GENERATION_PROMPT,
+    SEQUENCE_PLAN_PROMPT,
+    SEQUENCE_STEP_PROMPT,
+)
+from app.services.deadline import DeadlineExceeded
+from app.services.pricing import estimate_cost, is_priced, providers_listing
+
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+    from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
 
-# Approximate cost per 1K tokens (USD) for gpt-4o-mini as of 2024
-INPUT_COST_PER_1K = 0.00015
-OUTPUT_COST_PER_1K = 0.0006
+PROVIDERS = AI_PROVIDERS
+# Model stages, each routed to its own provider/model (settings.<stage>_model).
+MODEL_STAGES = ("analysis", "planning", "generation")
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    provider: str
+    model: str
+
+    @classmethod
+    def parse(cls, spec: str) -> "ModelRoute":
+        """Accepts "provider:model", a bare model (on settings.ai_provider) or "" (default model)."""
+        provider, sep, model = spec.strip().partition(":")
+        if not (sep and provider in PROVIDERS):
+            provider, model = settings.ai_provider, spec.strip()
+        if not model:
+            model = settings.groq_model if provider == "groq" else settings.openai_model
+        return cls(provider, model)
+
+    def check(self) -> None:
+        """Reject a model that the price list places on another provider (e.g. groq:gpt-4o)."""
+        listed = providers_listing(self.model)
+        if listed and self.provider not in listed:
+            raise ValueError(f"Model {self.model} is not a {self.provider} model (listed for {', '.join(sorted(listed))})")
+
+    def __str__(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+def resolve_routes(overrides: dict[str, str] | None = None) -> dict[str, ModelRoute]:
+    """
+    Route per stage from settings, with per-request `overrides` on top. Overrides may only
+    name models with a known price on their provider, so cost accounting stays complete;
+    raises ValueError. Settings routes are checked once at startup (check_routes).
+    """
+    overrides = overrides or {}
+    routes = {
+        "analysis": ModelRoute.parse(settings.analysis_model),
+        "generation": ModelRoute.parse(settings.generation_model),
+        "planning": ModelRoute.parse(settings.planning_model or settings.generation_model),
+    }
+    for stage, spec in overrides.items():
+        route = ModelRoute.parse(spec)
+        route.check()
+        if not is_priced(route.provider, route.model):
+            raise ValueError(f"Unsupported model for {stage}: {route}")
+        routes[stage] = route
+    if "generation" in overrides and "planning" not in overrides and not settings.planning_model:
+        routes["planning"] = routes["generation"]
+    return routes
+
+
+def check_routes() -> dict[str, ModelRoute]:
+    """
+    Validate the configured routes at startup: a model on the wrong provider raises
+    ValueError (the app does not start); a model without a price is allowed, with a warning.
+    """
+    routes = resolve_routes()
+    for stage, route in routes.items():
+        route.check()
+        if not is_priced(route.provider, route.model):
+            logger.warning("No pricing for %s model %s; its cost_estimate will be empty", stage, route)
+    return routes
 
 
-def _estimate_cost(input_tokens: int, output_tokens: int) -> float:
-    return (input_tokens / 1000.0) * INPUT_COST_PER_1K + (output_tokens / 1000.0) * OUTPUT_COST_PER_1K
+def _provider_error_types(name: str) -> tuple[type[Exception], ...]:
+    """`name` error classes of the provider SDKs imported so far (a client exists for each)."""
+    errors = []
+    for module_name in ("openai", "groq"):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            errors.append(getattr(module, name))
+    return tuple(errors)
+
+
+def _api_error_types() -> tuple[type[Exception], ...]:
+    return _provider_error_types("APIError")
 
 
 def _parse_json_from_content(content: str) -> dict[str, Any]:
-    """Extract JSON from model output; handle markdown code blocks."""
+    """
+    Extract JSON from model output; handle markdown code blocks. Raises
+    json.JSONDecodeError (orjson's error subclasses it).
+    """
     text = content.strip()
     if text.startswith("```"):
-        lines = text.split("\n")
-        if lines[0].startswith("```"):
-            lines = lines[1:]
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        text = "\n".join(lines)
-    return json.loads(text)
+        # Drop the opening fence line (```json) and a closing fence, without splitting lines.
+        newline = text.find("\n")
+        text = text[newline + 1:] if newline != -1 else ""
+        if text.endswith("```"):
+            text = text[:-3]
+    return orjson.loads(text)
 
 
 async def _chat_openai(
-    client: AsyncOpenAI,
+    client: "AsyncOpenAI",
     system: str,
     user: str,
     model: str | None = None,
+    timeout: float | None = None,
 ) -> tuple[dict[str, Any], int, int]:
     """Call OpenAI chat, return parsed JSON, input_tokens, output_tokens."""
     model = model or settings.openai_model
@@ -61,6 +145,7 @@ async def _chat_openai(
             {"role": "user", "content": user},
         ],
         temperature=0.6,
+        timeout=timeout,
     )
     choice = resp.choices[0]
     content = choice.message.content or "{}"
@@ -76,10 +161,11 @@ async def _chat_openai(
 
 
 async def _chat_groq(
-    client: AsyncGroq,
+    client: "AsyncGroq",
     system: str,
     user: str,
     model: str | None = None,
+    timeout: float | None = None,
 ) -> tuple[dict[str, Any], int, int]:
     """Call Groq chat, return parsed JSON, input_tokens, output_tokens."""
     model = model or settings.groq_model
@@ -91,6 +177,7 @@ async def _chat_groq(
         ],
         temperature=0.6,
         response_format={"type": "json_object"},  # Groq supports JSON mode
+        timeout=timeout,
     )
     choice = resp.choices[0]
     content = choice.message.content or "{}"
@@ -105,45 +192,109 @@ async def _chat_groq(
     return data, input_tokens, output_tokens
 
 
+# Share of the generation budget given to the planning call in parallel generation.
+PLAN_TIMEOUT_SHARE = 0.3
+
+
+def _fallback_message(step: int, company_context: str) -> dict[str, Any]:
+    return {
+        "step": step,
+        "thinking_process": "Fallback message.",
+        "content": f"Hi, I'd love to connect and share how we help with {company_context[:50]}...",
+        "confidence_score": 0.5,
+    }
+
+
+def _normalize_plan(steps: Any, sequence_length: int) -> list[dict[str, Any]]:
+    """Exactly sequence_length steps numbered 1..N, filling gaps in a malformed plan."""
+    planned = [s for s in steps if isinstance(s, dict)] if isinstance(steps, list) else []
+    normalized = []
+    for i in range(sequence_length):
+        step = planned[i] if i < len(planned) else {}
+        default_purpose = "connection request" if i == 0 else f"follow-up {i}"
+        normalized.append(
+            {
+                "step": i + 1,
+                "purpose": str(step.get("purpose") or default_purpose),
+                "angle": str(step.get("angle") or "Build on the previous messages with a new, relevant point."),
+            }
+        )
+    return normalized
+
+
 class AIService:
-    def __init__(self) -> None:
-        self._openai_client: AsyncOpenAI | None = None
-        self._groq_client: AsyncGroq | None = None
+    def __init__(self, routes: dict[str, ModelRoute] | None = None) -> None:
+        self.routes = routes or resolve_routes()
+        # Per stage: provider, model, calls and tokens of the completions made so far.
+        self.usage: dict[str, dict[str, Any]] = {}
+        self._openai_client: "AsyncOpenAI | None" = None
+        self._groq_client: "AsyncGroq | None" = None
 
-    def _get_openai_client(self) -> AsyncOpenAI:
+    def _get_openai_client(self) -> "AsyncOpenAI":
         if self._openai_client is None:
             if not settings.openai_api_key:
                 raise ValueError("OPENAI_API_KEY is not set")
+            from openai import AsyncOpenAI
+
             self._openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
         return self._openai_client
 
-    def _get_groq_client(self) -> AsyncGroq:
+    def _get_groq_client(self) -> "AsyncGroq":
         if self._groq_client is None:
-            if not GROQ_AVAILABLE:
-                raise ValueError("Groq package not installed. Run: pip install groq")
             if not settings.groq_api_key:
                 raise ValueError("GROQ_API_KEY is not set")
+            try:
+                from groq import AsyncGroq
+            except ImportError:
+                raise ValueError("Groq package not installed. Run: pip install groq")
             self._groq_client = AsyncGroq(api_key=settings.groq_api_key)
         return self._groq_client
 
+    async def _chat(
+        self, stage: str, system: str, user: str, timeout: float | None = None
+    ) -> tuple[dict[str, Any], int, int]:
+        route = self.routes[stage]
+        if route.provider == "groq":
+            result = await _chat_groq(self._get_groq_client(), system, user, model=route.model, timeout=timeout)
+        else:
+            result = await _chat_openai(self._get_openai_client(), system, user, model=route.model, timeout=timeout)
+        usage = self.usage.setdefault(
+            stage,
+            {"provider": route.provider, "model": route.model, "calls": 0, "input_tokens": 0, "output_tokens": 0},
+        )
+        usage["calls"] += 1
+        usage["input_tokens"] += result[1]
+        usage["output_tokens"] += result[2]
+        return result
+
+    def stage_usage(self) -> dict[str, dict[str, Any]]:
+        """Usage per stage with its cost_estimate (None when the model has no price)."""
+        return {
+            stage: {**u, "cost_estimate": estimate_cost(u["provider"], u["model"], u["input_tokens"], u["output_tokens"])}
+            for stage, u in self.usage.items()
+        }
+
     async def analyze_prospect(
         self,
         prospect_url: str,
         company_context: str,
+        timeout: float | None = None,
     ) -> tuple[dict[str, Any], int, int]:
-        """Returns (profile_data dict, input_tokens, output_tokens)."""
+        """
+        Returns (profile_data dict, input_tokens, output_tokens).
+        With a `timeout` (the stage's share of the request deadline), a provider timeout
+        raises DeadlineExceeded instead of falling back.
+        """
         system = "You output only valid JSON. No markdown, no explanation."
         user = PROFILE_ANALYSIS_PROMPT.format(
             prospect_url=prospect_url,
             company_context=company_context,
         )
         try:
-            if settings.ai_provider == "groq":
-                data, inp, out = await _chat_groq(self._get_groq_client(), system, user)
-            else:
-                data, inp, out = await _chat_openai(self._get_openai_client(), system, user)
-            return data, inp, out
-        except (OpenAIAPIError, GroqAPIError) as e:
+            return await self._chat("analysis", system, user, timeout)
+        except _api_error_types() as e:
+            if timeout is not None and isinstance(e, _provider_error_types("APITimeoutError")):
+                raise DeadlineExceeded("analysis") from e
             logger.exception("AI API error during profile analysis: %s", e)
             # Fallback: minimal analysis so the pipeline can continue
             fallback = {
@@ -162,6 +313,7 @@ class AIService:
         warmth: float,
         directness: float,
         sequence_length: int,
+        timeout: float | None = None,
     ) -> tuple[dict[str, Any], int, int]:
         """Returns (response with thinking_summary + messages, input_tokens, output_tokens)."""
         tov_instructions = tov_to_instructions(formality, warmth, directness)
@@ -174,27 +326,105 @@ class AIService:
             sequence_length=sequence_length,
         )
         try:
-            if settings.ai_provider == "groq":
-                data, inp, out = await _chat_groq(self._get_groq_client(), system, user)
-            else:
-                data, inp, out = await _chat_openai(self._get_openai_client(), system, user)
-            return data, inp, out
-        except (OpenAIAPIError, GroqAPIError) as e:
+            return await self._chat("generation", system, user, timeout)
+        except _api_error_types() as e:
+            if timeout is not None and isinstance(e, _provider_error_types("APITimeoutError")):
+                raise DeadlineExceeded("generation") from e
             logger.exception("AI API error during sequence generation: %s", e)
             fallback = {
                 "thinking_summary": "Generation failed due to API error.",
-                "messages": [
-                    {
-                        "step": i + 1,
-                        "thinking_process": "Fallback message.",
-                        "content": f"Hi, I'd love to connect and share how we help with {company_context[:50]}...",
-                        "confidence_score": 0.5,
-                    }
-                    for i in range(sequence_length)
-                ],
+                "messages": [_fallback_message(i + 1, company_context) for i in range(sequence_length)],
             }
             return fallback, 0, 0
 
-    @staticmethod
-    def estimate_cost(input_tokens: int, output_tokens: int) -> float:
-        return _estimate_cost(input_tokens, output_tokens)
+    async def generate_sequence_parallel(
+        self,
+        prospect_analysis: dict[str, Any],
+        company_context: str,
+        formality: float,
+        warmth: float,
+        directness: float,
+        sequence_length: int,
+        timeout: float | None = None,
+    ) -> tuple[dict[str, Any], int, int]:
+        """
+        Same contract as generate_sequence, for long sequences: one short call plans the
+        steps, then every step is written by its own completion, concurrently, with the
+        shared context and the plan. Latency is roughly plan + slowest step instead of
+        growing with sequence_length. Tokens are summed over all calls.
+        """
+        started = time.monotonic()
+        tov_instructions = tov_to_instructions(formality, warmth, directness)
+        analysis_str = json.dumps(prospect_analysis, indent=2)
+        system = "You output only valid JSON. No markdown, no explanation."
+
+        plan_timeout = timeout * PLAN_TIMEOUT_SHARE if timeout is not None else None
+        plan_prompt = SEQUENCE_PLAN_PROMPT.format(
+            prospect_analysis=analysis_str,
+            company_context=company_context,
+            tov_instructions=tov_instructions,
+            sequence_length=sequence_length,
+        )
+        try:
+            plan, total_in, total_out = await self._chat("planning", system, plan_prompt, plan_timeout)
+        except _api_error_types() as e:
+            if timeout is not None and isinstance(e, _provider_error_types("APITimeoutError")):
+                raise DeadlineExceeded("generation") from e
+            logger.exception("AI API error during sequence planning: %s", e)
+            plan, total_in, total_out = {}, 0, 0
+        steps = _normalize_plan(plan.get("steps"), sequence_length)
+        plan_str = json.dumps(steps)
+
+        expires_at = started + timeout if timeout is not None else None
+        limit = asyncio.Semaphore(settings.parallel_generation_max_concurrency)
+
+        async def write_step(planned: dict[str, Any]) -> tuple[dict[str, Any], int, int]:
+            step = planned["step"]
+            user = SEQUENCE_STEP_PROMPT.format(
+                prospect_analysis=analysis_str,
+                company_context=company_context,
+                tov_instructions=tov_instructions,
+                sequence_plan=plan_str,
+                step=step,
+                sequence_length=sequence_length,
+                purpose=planned["purpose"],
+                angle=planned["angle"],
+                max_chars=300 if step == 1 else 500,
+            )
+            async with limit:
+                # Budget from when the slot is acquired: steps queued behind the semaphore
+                # only get what is left of the generation budget.
+                step_timeout = None
+                if expires_at is not None:
+                    step_timeout = expires_at - time.monotonic()
+                    if step_timeout <= 0:
+                        raise DeadlineExceeded("generation")
+                try:
+                    data, inp, out = await self._chat("generation", system, user, step_timeout)
+                except _api_error_types() as e:
+                    if timeout is not None and isinstance(e, _provider_error_types("APITimeoutError")):
+                        raise DeadlineExceeded("generation") from e
+                    logger.exception("AI API error generating step %d: %s", step, e)
+                    return _fallback_message(step, company_context), 0, 0
+            if not data.get("content"):
+                return _fallback_message(step, company_context), inp, out
+            data["step"] = step
+            return data, inp, out
+
+        # On the first failure (e.g. DeadlineExceeded from one step), or when this call is
+        # cancelled, the other steps are cancelled too, so no completion keeps running and
+        # billing after the request has ended.
+        tasks = [asyncio.create_task(write_step(planned)) for planned in steps]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        messages = []
+        for data, inp, out in results:
+            messages.append(data)
+            total_in += inp
+            total_out += out
+        summary = plan.get("thinking_summary") or "Sequence planned step by step; each message generated independently."
+        return {"thinking_summary": summary, "messages": messages}, total_in, total_out
@@ -0,0 +1,65 @@
+"""
+Per-request deadline split across the analysis, generation and persistence stages.
+
+Each stage gets a share of the time that is left when it starts, proportional to its
+weight among the stages still to run, so time saved by a fast stage rolls over to the
+later ones. Stage work runs under asyncio.wait_for: when the budget runs out the work is
+cancelled (including in-flight provider HTTP calls) and DeadlineExceeded is raised, so
+nothing is persisted for a request the client has already given up on.
+"""
+import asyncio
+import time
+from collections.abc import Awaitable
+from typing import TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+# Relative weights; generation writes N messages and dominates.
+STAGE_WEIGHTS = {"analysis": 0.3, "generation": 0.6, "persistence": 0.1}
+STAGES = tuple(STAGE_WEIGHTS)
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str) -> None:
+        super().__init__(f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def for_request(cls, *requested: float | None) -> "Deadline":
+        """Tightest of the client-requested timeouts, else the default; capped by the max."""
+        values = [v for v in requested if v is not None]
+        seconds = min(values) if values else settings.request_timeout_seconds
+        return cls(min(seconds, settings.max_request_timeout_seconds))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def stage_timeout(self, stage: str) -> float:
+        """Budget for `stage`: its weighted share of what remains across this and later stages."""
+        later = STAGES[STAGES.index(stage):]
+        share = STAGE_WEIGHTS[stage] / sum(STAGE_WEIGHTS[s] for s in later)
+        return self.remaining() * share
+
+    async def run(self, stage: str, work: Awaitable[T], timeout: float | None = None) -> T:
+        """Await `work` within the stage budget (or an explicit `timeout`); cancel it on expiry."""
+        timeout = self.stage_timeout(stage) if timeout is None else timeout
+        if timeout <= 0:
+            if asyncio.iscoroutine(work):
+                work.close()
+            raise DeadlineExceeded(stage)
+        try:
+            return await asyncio.wait_for(work, timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage) from None
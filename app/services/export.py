@@ -0,0 +1,262 @@
+"""
+Streaming export of sequences with their messages and AI usage, as NDJSON or CSV.
+
+Rows come from a server-side cursor (AsyncSession.stream with yield_per), so memory stays
+flat however many sequences match: at most settings.export_fetch_size rows, one sequence
+being assembled and one output chunk are held at a time.
+
+- ndjson: one JSON object per sequence, with its messages and ai_generation nested.
+- csv: one row per message with the sequence columns repeated; JSON columns are encoded
+  as JSON text. A sequence without messages gets one row with empty message columns.
+
+Also runnable as a CLI (e.g. for the warehouse sync):
+    python -m app.services.export --format ndjson --from 2026-09-01 --to 2026-10-01 > sequences.ndjson
+"""
+import argparse
+import asyncio
+import csv
+import io
+import sys
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+import orjson
+from sqlalchemy import Select, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import AIGeneration, MessageSequence, Prospect, SequenceMessage
+from app.services.generate import _normalize_linkedin_url
+
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# Output is flushed in chunks of about this size rather than per row.
+CHUNK_BYTES = 64 * 1024
+
+CSV_COLUMNS = (
+    "sequence_id",
+    "created_at",
+    "prospect_id",
+    "prospect_url",
+    "context_id",
+    "sequence_length",
+    "formality",
+    "warmth",
+    "directness",
+    "model_used",
+    "input_tokens",
+    "output_tokens",
+    "cost_estimate",
+    "stage_usage",
+    "step",
+    "content",
+    "thinking_process",
+    "confidence_score",
+)
+
+
+def export_query(
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    prospect_id: str | None = None,
+    prospect_url: str | None = None,
+) -> Select:
+    """One row per message (or per sequence without messages), grouped by sequence."""
+    # Bounds go on every table's partition key, so each table only scans the months in
+    # range (PostgreSQL does not carry range filters across the join's equality).
+    def child_join(table):
+        on = [table.sequence_id == MessageSequence.id, table.sequence_created_at == MessageSequence.created_at]
+        if created_from:
+            on.append(table.sequence_created_at >= created_from)
+        if created_to:
+            on.append(table.sequence_created_at < created_to)
+        return and_(*on)
+
+    filters = []
+    if created_from:
+        filters.append(MessageSequence.created_at >= created_from)
+    if created_to:
+        filters.append(MessageSequence.created_at < created_to)
+    if prospect_id:
+        filters.append(MessageSequence.prospect_id == prospect_id)
+    if prospect_url:
+        filters.append(Prospect.linkedin_url == _normalize_linkedin_url(prospect_url))
+
+    return (
+        select(
+            MessageSequence.id.label("sequence_id"),
+            MessageSequence.created_at,
+            MessageSequence.prospect_id,
+            Prospect.linkedin_url,
+            MessageSequence.context_id,
+            MessageSequence.tov_config,
+            MessageSequence.sequence_length,
+            AIGeneration.model_used,
+            AIGeneration.input_tokens,
+            AIGeneration.output_tokens,
+            AIGeneration.cost_estimate,
+            AIGeneration.stage_usage,
+            SequenceMessage.step_number,
+            SequenceMessage.content,
+            SequenceMessage.thinking_process,
+            SequenceMessage.confidence_score,
+        )
+        .join(Prospect, Prospect.id == MessageSequence.prospect_id)
+        .outerjoin(AIGeneration, child_join(AIGeneration))
+        .outerjoin(SequenceMessage, child_join(SequenceMessage))
+        .where(*filters)
+        # (id, created_at) is the primary key, so this order is a merge of per-partition
+        # index scans rather than a sort of the whole result; messages follow by step.
+        .order_by(MessageSequence.id, MessageSequence.created_at, SequenceMessage.step_number)
+    )
+
+
+class SequenceExportService:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def stream(
+        self,
+        fmt: str,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        prospect_id: str | None = None,
+        prospect_url: str | None = None,
+        fetch_size: int | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Yield the export as byte chunks. The query runs before the first chunk is yielded."""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        stmt = export_query(created_from, created_to, prospect_id, prospect_url)
+        result = await self.session.stream(stmt.execution_options(yield_per=fetch_size or settings.export_fetch_size))
+        try:
+            lines = _ndjson_lines(result) if fmt == "ndjson" else _csv_lines(result)
+            buffer = bytearray()
+            async for line in lines:
+                buffer += line
+                if len(buffer) >= CHUNK_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+            if buffer:
+                yield bytes(buffer)
+        finally:
+            await result.close()
+
+
+async def _ndjson_lines(rows) -> AsyncIterator[bytes]:
+    sequence = None
+    async for row in rows:
+        if sequence is None or row.sequence_id != sequence["sequence_id"]:
+            if sequence is not None:
+                yield orjson.dumps(sequence) + b"\n"
+            sequence = {
+                "sequence_id": row.sequence_id,
+                "created_at": row.created_at,
+                "prospect_id": row.prospect_id,
+                "prospect_url": row.linkedin_url,
+                "context_id": row.context_id,
+                "tov_config": row.tov_config,
+                "sequence_length": row.sequence_length,
+                "ai_generation": {
+                    "model_used": row.model_used,
+                    "input_tokens": row.input_tokens,
+                    "output_tokens": row.output_tokens,
+                    "cost_estimate": row.cost_estimate,
+                    "stage_usage": row.stage_usage,
+                }
+                if row.model_used is not None
+                else None,
+                "messages": [],
+            }
+        if row.step_number is not None:
+            sequence["messages"].append(
+                {
+                    "step": row.step_number,
+                    "content": row.content,
+                    "thinking_process": row.thinking_process,
+                    "confidence_score": row.confidence_score,
+                }
+            )
+    if sequence is not None:
+        yield orjson.dumps(sequence) + b"\n"
+
+
+def _json_text(value) -> str | None:
+    return orjson.dumps(value).decode() if value is not None else None
+
+
+async def _csv_lines(rows) -> AsyncIterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def take() -> bytes:
+        data = out.getvalue().encode()
+        out.seek(0)
+        out.truncate()
+        return data
+
+    writer.writerow(CSV_COLUMNS)
+    yield take()
+    async for row in rows:
+        tov = row.tov_config or {}
+        writer.writerow(
+            (
+                row.sequence_id,
+                row.created_at.isoformat(),
+                row.prospect_id,
+                row.linkedin_url,
+                row.context_id,
+                row.sequence_length,
+                tov.get("formality"),
+                tov.get("warmth"),
+                tov.get("directness"),
+                row.model_used,
+                row.input_tokens,
+                row.output_tokens,
+                row.cost_estimate,
+                _json_text(row.stage_usage),
+                row.step_number,
+                row.content,
+                _json_text(row.thinking_process),
+                row.confidence_score,
+            )
+        )
+        yield take()
+
+
+async def _main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.export", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--from", dest="created_from", type=datetime.fromisoformat, help="created at or after (ISO 8601)")
+    parser.add_argument("--to", dest="created_to", type=datetime.fromisoformat, help="created before (ISO 8601)")
+    parser.add_argument("--prospect-id")
+    parser.add_argument("--prospect-url")
+    parser.add_argument("--fetch-size", type=int, default=None)
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    from app.db.session import get_engine, get_session_factory
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async with get_session_factory()() as session:
+            service = SequenceExportService(session)
+            async for chunk in service.stream(
+                args.format,
+                created_from=args.created_from,
+                created_to=args.created_to,
+                prospect_id=args.prospect_id,
+                prospect_url=args.prospect_url,
+                fetch_size=args.fetch_size,
+            ):
+                out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+        await get_engine().dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
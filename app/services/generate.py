@@ -1,22 +1,27 @@
 """
 Orchestrates: prospect resolution -> profile analysis -> sequence generation -> persistence.
 """
+import asyncio
 import logging
 from datetime import datetime
 from urllib.parse import urlparse
 
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.models import Prospect, MessageSequence, SequenceMessage, AIGeneration
+from app.models import Prospect, CompanyContext, MessageSequence, SequenceMessage, AIGeneration, context_hash
+from app.models.sequence import gen_uuid
 from app.schemas.generate import (
     GenerateSequenceRequest,
     GenerateSequenceResponse,
     MessageOutput,
     ProspectAnalysisOutput,
 )
-from app.services.ai import AIService
+from app.services.ai import AIService, resolve_routes
+from app.services.deadline import Deadline
+from app.services.persistence import SequenceRecord, write_behind
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +39,15 @@ def _slug_from_url(url: str) -> str:
     return parts[-1] if parts else "unknown"
 
 
+def _use_parallel(sequence_length: int) -> bool:
+    """Pick the generation strategy (settings.generation_strategy) for this sequence length."""
+    if settings.generation_strategy == "parallel":
+        return True
+    if settings.generation_strategy == "single":
+        return False
+    return sequence_length >= settings.parallel_generation_min_length
+
+
 async def get_or_create_prospect(session: AsyncSession, prospect_url: str) -> Prospect:
     url = _normalize_linkedin_url(prospect_url)
     result = await session.execute(select(Prospect).where(Prospect.linkedin_url == url))
@@ -45,24 +59,53 @@ async def get_or_create_prospect(session: AsyncSession, prospect_url: str) -> Pr
     return prospect
 
 
+async def get_or_create_context(session: AsyncSession, company_context: str) -> str:
+    """Store the context text once, keyed by its hash; returns the context id."""
+    context_id = context_hash(company_context)
+    stmt = (
+        pg_insert(CompanyContext)
+        .values(id=context_id, content=company_context, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[CompanyContext.id])
+    )
+    await session.execute(stmt)
+    return context_id
+
+
 class GenerateSequenceService:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
-        self.ai = AIService()
 
-    async def run(self, body: GenerateSequenceRequest) -> GenerateSequenceResponse:
-        # 1) Get or create prospect
-        prospect = await get_or_create_prospect(self.session, body.prospect_url)
+    async def run(self, body: GenerateSequenceRequest, deadline: Deadline | None = None) -> GenerateSequenceResponse:
+        """
+        Runs the pipeline within `deadline` (default: from the request / settings).
+        Raises DeadlineExceeded when a stage runs out of time; in-flight work is cancelled
+        and nothing is flushed after that point, so the transaction rolls back.
 
-        # 2) Analyze profile (AI)
-        profile_data, analysis_in_tok, analysis_out_tok = await self.ai.analyze_prospect(
-            body.prospect_url,
-            body.company_context,
-        )
+        With persistence_mode "write_behind" the response is returned once the record is
+        queued; ids are allocated here and the flusher writes the rows shortly after.
+        """
+        deadline = deadline or Deadline.for_request(body.timeout_seconds)
+        ai = AIService(resolve_routes(body.models))
+        deferred = settings.persistence_mode == "write_behind"
 
-        prospect.profile_data = profile_data
-        prospect.analyzed_at = datetime.utcnow()
-        await self.session.flush()
+        # 1) Get or create prospect, overlapped with the analysis call (neither needs the
+        #    other). In write-behind mode the flusher upserts the prospect by URL instead.
+        lookup = None if deferred else asyncio.create_task(get_or_create_prospect(self.session, body.prospect_url))
+
+        # 2) Analyze profile (AI)
+        timeout = deadline.stage_timeout("analysis")
+        try:
+            profile_data, analysis_in_tok, analysis_out_tok = await deadline.run(
+                "analysis",
+                ai.analyze_prospect(body.prospect_url, body.company_context, timeout=timeout),
+                timeout,
+            )
+        except BaseException:
+            if lookup is not None:
+                lookup.cancel()
+                await asyncio.gather(lookup, return_exceptions=True)
+            raise
+        prospect = await lookup if lookup is not None else None
 
         # 3) Build prospect analysis for response
         analysis_out = ProspectAnalysisOutput(
@@ -74,34 +117,110 @@ class GenerateSequenceService:
 
         # 4) Generate sequence (AI)
         tov = body.tov_config
-        seq_data, seq_in_tok, seq_out_tok = await self.ai.generate_sequence(
-            prospect_analysis=profile_data,
-            company_context=body.company_context,
-            formality=tov.formality,
-            warmth=tov.warmth,
-            directness=tov.directness,
-            sequence_length=body.sequence_length,
+        timeout = deadline.stage_timeout("generation")
+        generate = ai.generate_sequence_parallel if _use_parallel(body.sequence_length) else ai.generate_sequence
+        seq_data, seq_in_tok, seq_out_tok = await deadline.run(
+            "generation",
+            generate(
+                prospect_analysis=profile_data,
+                company_context=body.company_context,
+                formality=tov.formality,
+                warmth=tov.warmth,
+                directness=tov.directness,
+                sequence_length=body.sequence_length,
+                timeout=timeout,
+            ),
+            timeout,
+        )
+
+        # 5) Token tracking: per stage, priced per model; the total cost is left empty if
+        #    any stage ran on a model without a price.
+        total_in = analysis_in_tok + seq_in_tok
+        total_out = analysis_out_tok + seq_out_tok
+        stage_usage = ai.stage_usage()
+        costs = [u["cost_estimate"] for u in stage_usage.values()]
+        cost = sum(costs) if costs and None not in costs else None
+        model_name = ai.routes["generation"].model
+        messages_list = seq_data.get("messages") or []
+
+        # 6) Persist profile, sequence, messages and AI generation record
+        if deferred:
+            sequence_id, context_id = await deadline.run(
+                "persistence",
+                self._submit(body, profile_data, messages_list, model_name, total_in, total_out, cost, stage_usage),
+            )
+        else:
+            sequence, context_id = await deadline.run(
+                "persistence",
+                self._persist(
+                    body, prospect, profile_data, messages_list, model_name, total_in, total_out, cost, stage_usage
+                ),
+            )
+            sequence_id = sequence.id
+
+        # 7) Build response
+        message_outputs = [
+            MessageOutput(
+                step=m.get("step", i + 1),
+                content=m.get("content", ""),
+                thinking_process={"reasoning": m.get("thinking_process")} if m.get("thinking_process") else None,
+                confidence_score=float(m["confidence_score"]) if m.get("confidence_score") is not None else None,
+            )
+            for i, m in enumerate(messages_list)
+        ]
+        token_usage = {
+            "input_tokens": total_in,
+            "output_tokens": total_out,
+            "cost_estimate_usd": cost,
+            "stages": stage_usage,
+        }
+
+        return GenerateSequenceResponse(
+            sequence_id=sequence_id,
+            context_id=context_id,
+            prospect_analysis=analysis_out,
+            messages=message_outputs,
+            thinking_process_summary=seq_data.get("thinking_summary"),
+            model_used=model_name,
+            token_usage=token_usage,
         )
 
-        # 5) Persist sequence and messages
+    async def _persist(
+        self,
+        body: GenerateSequenceRequest,
+        prospect: Prospect,
+        profile_data: dict,
+        messages_list: list[dict],
+        model_name: str,
+        total_in: int,
+        total_out: int,
+        cost: float | None,
+        stage_usage: dict,
+    ) -> tuple[MessageSequence, str]:
+        prospect.profile_data = profile_data
+        prospect.analyzed_at = datetime.utcnow()
+
+        tov = body.tov_config
         tov_snapshot = {
             "formality": tov.formality,
             "warmth": tov.warmth,
             "directness": tov.directness,
         }
+        context_id = await get_or_create_context(self.session, body.company_context)
         sequence = MessageSequence(
             prospect_id=prospect.id,
             tov_config=tov_snapshot,
-            company_context=body.company_context,
+            context_id=context_id,
             sequence_length=body.sequence_length,
+            created_at=datetime.utcnow(),
         )
         self.session.add(sequence)
         await self.session.flush()
 
-        messages_list = seq_data.get("messages") or []
         for m in messages_list:
             msg = SequenceMessage(
                 sequence_id=sequence.id,
+                sequence_created_at=sequence.created_at,
                 step_number=int(m.get("step", 0)),
                 content=m.get("content", ""),
                 thinking_process={"reasoning": m.get("thinking_process")} if m.get("thinking_process") else None,
@@ -109,39 +228,57 @@ class GenerateSequenceService:
             )
             self.session.add(msg)
 
-        # 6) Token tracking / AI generation record
-        total_in = analysis_in_tok + seq_in_tok
-        total_out = analysis_out_tok + seq_out_tok
-        cost = AIService.estimate_cost(total_in, total_out) if (total_in or total_out) else None
-        model_name = settings.groq_model if settings.ai_provider == "groq" else settings.openai_model
         ai_gen = AIGeneration(
             sequence_id=sequence.id,
+            sequence_created_at=sequence.created_at,
             model_used=model_name,
             input_tokens=total_in,
             output_tokens=total_out,
             cost_estimate=cost,
+            stage_usage=stage_usage,
         )
         self.session.add(ai_gen)
         await self.session.flush()
+        return sequence, context_id
 
-        # 7) Build response
-        message_outputs = [
-            MessageOutput(
-                step=m.get("step", i + 1),
-                content=m.get("content", ""),
-                thinking_process={"reasoning": m.get("thinking_process")} if m.get("thinking_process") else None,
-                confidence_score=float(m["confidence_score"]) if m.get("confidence_score") is not None else None,
-            )
-            for i, m in enumerate(messages_list)
-        ]
-        token_usage = {"input_tokens": total_in, "output_tokens": total_out, "cost_estimate_usd": cost}
-
-        model_name = settings.groq_model if settings.ai_provider == "groq" else settings.openai_model
-        return GenerateSequenceResponse(
-            sequence_id=sequence.id,
-            prospect_analysis=analysis_out,
-            messages=message_outputs,
-            thinking_process_summary=seq_data.get("thinking_summary"),
+    async def _submit(
+        self,
+        body: GenerateSequenceRequest,
+        profile_data: dict,
+        messages_list: list[dict],
+        model_name: str,
+        total_in: int,
+        total_out: int,
+        cost: float | None,
+        stage_usage: dict,
+    ) -> tuple[str, str]:
+        now = datetime.utcnow()
+        tov = body.tov_config
+        record = SequenceRecord(
+            sequence_id=gen_uuid(),
+            created_at=now,
+            prospect_url=_normalize_linkedin_url(body.prospect_url),
+            profile_data=profile_data,
+            analyzed_at=now,
+            context_id=context_hash(body.company_context),
+            company_context=body.company_context,
+            tov_config={"formality": tov.formality, "warmth": tov.warmth, "directness": tov.directness},
+            sequence_length=body.sequence_length,
             model_used=model_name,
-            token_usage=token_usage,
+            input_tokens=total_in,
+            output_tokens=total_out,
+            cost_estimate=cost,
+            stage_usage=stage_usage,
+            messages=[
+                {
+                    "id": gen_uuid(),
+                    "step_number": int(m.get("step", 0)),
+                    "content": m.get("content", ""),
+                    "thinking_process": {"reasoning": m.get("thinking_process")} if m.get("thinking_process") else None,
+                    "confidence_score": float(m["confidence_score"]) if m.get("confidence_score") is not None else None,
+                }
+                for m in messages_list
+            ],
         )
+        await write_behind.submit(record)
+        return record.sequence_id, record.context_id
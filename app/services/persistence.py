@@ -0,0 +1,399 @@
+"""
+Write-behind persistence for generated sequences (settings.persistence_mode = "write_behind").
+
+The request path builds a SequenceRecord with pre-allocated ids, hands it to the
+WriteBehindWriter and responds; a background flusher persists records in batched
+transactions:
+
+- backpressure: the queue is bounded, so submit() waits (within the request's persistence
+  budget) when the database falls behind instead of buffering without limit;
+- retry: a batch that fails on the connection is retried with exponential backoff and then
+  spooled whole. While the database stays unreachable, later batches go straight to the
+  spool (one probe every OUTAGE_PROBE_SECONDS), so the flusher keeps up with the queue
+  instead of waiting on connect timeouts. A batch the database rejects (IntegrityError,
+  DataError) is bisected, and only records rejected on their own are set aside in the
+  .rejected file, which is never replayed. Every insert is ON CONFLICT DO NOTHING on
+  pre-allocated ids, so replays are idempotent;
+- durability: spooled batches, and anything left at shutdown, are appended to a JSONL
+  spool file. It is replayed at start, after the next successful flush, and every
+  OUTAGE_PROBE_SECONDS while idle;
+- drain: stop() flushes what is queued before the process exits (lifespan shutdown).
+"""
+import asyncio
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import DataError, IntegrityError, InterfaceError, OperationalError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import AIGeneration, CompanyContext, MessageSequence, Prospect, SequenceMessage
+from app.models.sequence import gen_uuid
+
+logger = logging.getLogger(__name__)
+
+_DATETIME_FIELDS = ("created_at", "analyzed_at")
+
+# The database could not be reached: retrying or spooling the whole batch is all we can do.
+CONNECTION_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+# The database rejected the data: one bad record fails its whole batch, so bisect.
+DATA_ERRORS = (IntegrityError, DataError)
+# While the database is unreachable, how often a batch probes it (and the idle replay tick).
+OUTAGE_PROBE_SECONDS = 10.0
+
+
+@dataclass
+class SequenceRecord:
+    """Everything one generate request writes, with ids allocated up front."""
+
+    sequence_id: str
+    created_at: datetime
+    prospect_url: str
+    profile_data: dict
+    analyzed_at: datetime
+    context_id: str
+    company_context: str
+    tov_config: dict
+    sequence_length: int
+    model_used: str
+    input_tokens: int
+    output_tokens: int
+    cost_estimate: float | None
+    stage_usage: dict | None = None
+    # Rows for sequence_messages: id, step_number, content, thinking_process, confidence_score
+    messages: list[dict] = field(default_factory=list)
+    generation_id: str = field(default_factory=gen_uuid)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        for name in _DATETIME_FIELDS:
+            data[name] = data[name].isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, line: str) -> "SequenceRecord":
+        data = json.loads(line)
+        for name in _DATETIME_FIELDS:
+            data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
+
+
+async def persist_records(session: AsyncSession, records: list[SequenceRecord]) -> None:
+    """Insert a batch of records with one statement per table (caller commits)."""
+    # Prospects: upsert by URL. One row per URL per statement (ON CONFLICT DO UPDATE can't
+    # touch a row twice), keeping the most recent analysis. The update only applies when
+    # it is newer than the stored one, so a late flush or a spool replay never overwrites
+    # fresher profile data.
+    latest: dict[str, SequenceRecord] = {}
+    for record in records:
+        current = latest.get(record.prospect_url)
+        if current is None or record.analyzed_at >= current.analyzed_at:
+            latest[record.prospect_url] = record
+    stmt = pg_insert(Prospect).values(
+        [
+            {
+                "id": gen_uuid(),
+                "linkedin_url": url,
+                "profile_data": r.profile_data,
+                "analyzed_at": r.analyzed_at,
+                "created_at": r.created_at,
+            }
+            for url, r in latest.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Prospect.linkedin_url],
+        set_={"profile_data": stmt.excluded.profile_data, "analyzed_at": stmt.excluded.analyzed_at},
+        where=or_(Prospect.analyzed_at.is_(None), Prospect.analyzed_at < stmt.excluded.analyzed_at),
+    ).returning(Prospect.id, Prospect.linkedin_url)
+    prospect_ids = {url: prospect_id for prospect_id, url in (await session.execute(stmt)).all()}
+    # Rows skipped by the WHERE are not returned; look their ids up.
+    stale = [url for url in latest if url not in prospect_ids]
+    if stale:
+        rows = await session.execute(select(Prospect.id, Prospect.linkedin_url).where(Prospect.linkedin_url.in_(stale)))
+        prospect_ids.update({url: prospect_id for prospect_id, url in rows.all()})
+
+    contexts = {r.context_id: r for r in records}
+    await session.execute(
+        pg_insert(CompanyContext)
+        .values([{"id": cid, "content": r.company_context, "created_at": r.created_at} for cid, r in contexts.items()])
+        .on_conflict_do_nothing(index_elements=[CompanyContext.id])
+    )
+
+    await session.execute(
+        pg_insert(MessageSequence)
+        .values(
+            [
+                {
+                    "id": r.sequence_id,
+                    "created_at": r.created_at,
+                    "prospect_id": prospect_ids[r.prospect_url],
+                    "tov_config": r.tov_config,
+                    "context_id": r.context_id,
+                    "sequence_length": r.sequence_length,
+                }
+                for r in records
+            ]
+        )
+        .on_conflict_do_nothing()
+    )
+
+    message_rows = [
+        {**m, "sequence_id": r.sequence_id, "sequence_created_at": r.created_at} for r in records for m in r.messages
+    ]
+    if message_rows:
+        await session.execute(pg_insert(SequenceMessage).values(message_rows).on_conflict_do_nothing())
+
+    await session.execute(
+        pg_insert(AIGeneration)
+        .values(
+            [
+                {
+                    "id": r.generation_id,
+                    "sequence_id": r.sequence_id,
+                    "sequence_created_at": r.created_at,
+                    "model_used": r.model_used,
+                    "input_tokens": r.input_tokens,
+                    "output_tokens": r.output_tokens,
+                    "cost_estimate": r.cost_estimate,
+                    "stage_usage": r.stage_usage,
+                    "created_at": r.created_at,
+                }
+                for r in records
+            ]
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+class WriteBehindWriter:
+    def __init__(
+        self,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        max_retries: int,
+        spool_path: str,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spool_path = Path(spool_path)
+        self.rejected_path = self.spool_path.with_name(self.spool_path.name + ".rejected")
+        self._queue_size = queue_size
+        self._queue: asyncio.Queue[SequenceRecord] | None = None
+        self._task: asyncio.Task | None = None
+        self._replay_task: asyncio.Task | None = None
+        self._batch: list[SequenceRecord] = []
+        # loop.time() until which the database is treated as down; None while it is up.
+        self._down_until: float | None = None
+        # Records were spooled since the last replay started.
+        self._spooled = False
+
+    @classmethod
+    def from_settings(cls) -> "WriteBehindWriter":
+        return cls(
+            queue_size=settings.write_behind_queue_size,
+            batch_size=settings.write_behind_batch_size,
+            flush_interval=settings.write_behind_flush_interval_seconds,
+            max_retries=settings.write_behind_max_retries,
+            spool_path=settings.write_behind_spool_path,
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "flushing": len(self._batch),
+            "database_down": self._down_until is not None,
+        }
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._task = asyncio.create_task(self._run(), name="write-behind-flusher")
+        self._replay_task = asyncio.create_task(self._replay_spool(), name="write-behind-replay")
+
+    async def submit(self, record: SequenceRecord) -> None:
+        """Queue a record; waits while the queue is full (backpressure)."""
+        if not self.running:
+            raise RuntimeError("write-behind writer is not running")
+        await self._queue.put(record)
+
+    async def stop(self, timeout: float | None = None) -> None:
+        """Drain: flush everything queued (up to `timeout`), spool the rest, stop the flusher."""
+        if self._task is None:
+            return
+        timeout = settings.write_behind_drain_timeout_seconds if timeout is None else timeout
+        if self._replay_task is not None:
+            # Unfinished replays stay in the .replaying file and are picked up next start.
+            self._replay_task.cancel()
+            await asyncio.gather(self._replay_task, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Write-behind drain timed out with %d records queued; spooling", self._queue.qsize())
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        leftover = list(self._batch)
+        while not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+        if leftover:
+            self._spool(leftover)
+        self._task = None
+        self._batch = []
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._spooled:
+                # Something is waiting in the spool: wake up periodically to replay it
+                # even when no new traffic comes in to trigger a flush.
+                try:
+                    first = await asyncio.wait_for(self._queue.get(), OUTAGE_PROBE_SECONDS)
+                except asyncio.TimeoutError:
+                    self._schedule_replay()
+                    continue
+            else:
+                first = await self._queue.get()
+            self._batch = [first]
+            flush_at = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                remaining = flush_at - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush_with_retry(self._batch)
+            for _ in self._batch:
+                self._queue.task_done()
+            self._batch = []
+
+    async def _flush(self, batch: list[SequenceRecord]) -> None:
+        from app.db.session import get_session_factory
+
+        async with get_session_factory()() as session:
+            await persist_records(session, batch)
+            await session.commit()
+
+    async def _flush_with_retry(self, batch: list[SequenceRecord]) -> None:
+        loop = asyncio.get_running_loop()
+        if self._down_until is not None and loop.time() < self._down_until:
+            # Known outage: spool without waiting on another connect timeout, so the queue
+            # keeps draining and submit() does not block requests that are already paid for.
+            self._spool(batch)
+            return
+        # During an outage one attempt is the probe; the full retry budget is for blips.
+        attempts = 1 if self._down_until is not None else self.max_retries
+        delay = 0.5
+        for attempt in range(1, attempts + 1):
+            try:
+                await self._flush(batch)
+            except DATA_ERRORS as e:
+                # Retrying the same rows will not help; find the ones the database rejects.
+                logger.warning("Write-behind batch of %d rejected: %s", len(batch), e)
+                self._database_up()
+                await self._isolate_failures(batch)
+                return
+            except Exception as e:
+                error = e
+                if attempt < attempts:
+                    logger.warning("Write-behind batch of %d failed (attempt %d): %s", len(batch), attempt, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 10.0)
+            else:
+                self._database_up()
+                return
+        logger.error("Write-behind batch of %d failed %d times, spooling: %s", len(batch), attempts, error)
+        self._spool_failed(batch, error)
+
+    async def _isolate_failures(self, batch: list[SequenceRecord]) -> None:
+        """
+        Bisect a batch the database rejected, one attempt per half, so a single bad record
+        (constraint violation, oversized payload) does not hold back the rest. Records
+        rejected on their own go to the .rejected file. If a half fails for any other
+        reason (e.g. the connection dropped), it and the halves not yet tried are spooled
+        whole for replay.
+        """
+        if len(batch) == 1:
+            logger.error("Write-behind record %s rejected, writing it to %s", batch[0].sequence_id, self.rejected_path)
+            self._spool(batch, self.rejected_path)
+            return
+        middle = len(batch) // 2
+        halves = [batch[:middle], batch[middle:]]
+        for i, half in enumerate(halves):
+            try:
+                await self._flush(half)
+            except DATA_ERRORS as e:
+                logger.warning("Write-behind sub-batch of %d rejected: %s", len(half), e)
+                await self._isolate_failures(half)
+            except Exception as e:
+                rest = [record for part in halves[i:] for record in part]
+                logger.error("Write-behind sub-batch of %d failed, spooling %d: %s", len(half), len(rest), e)
+                self._spool_failed(rest, e)
+                return
+
+    def _spool_failed(self, records: list[SequenceRecord], error: Exception) -> None:
+        if isinstance(error, CONNECTION_ERRORS):
+            if self._down_until is None:
+                logger.error("Database unreachable; spooling write-behind batches until it is back")
+            self._down_until = asyncio.get_running_loop().time() + OUTAGE_PROBE_SECONDS
+        self._spool(records)
+
+    def _database_up(self) -> None:
+        if self._down_until is not None:
+            logger.info("Database reachable again")
+            self._down_until = None
+        self._schedule_replay()
+
+    def _schedule_replay(self) -> None:
+        """Start replaying the spool if records are waiting and no replay is running."""
+        if not self._spooled or (self._replay_task is not None and not self._replay_task.done()):
+            return
+        if self._down_until is not None and asyncio.get_running_loop().time() < self._down_until:
+            return
+        self._spooled = False
+        self._replay_task = asyncio.create_task(self._replay_spool(), name="write-behind-replay")
+
+    def _spool(self, records: list[SequenceRecord], path: Path | None = None) -> None:
+        path = path or self.spool_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            for record in records:
+                f.write(record.to_json() + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if path == self.spool_path:
+            self._spooled = True
+
+    async def _replay_spool(self) -> None:
+        # Records are moved to a .replaying file (merged with one left by an interrupted
+        # replay) so that failures during the replay spool to a fresh file. Replayed
+        # records are flushed here in batches, not through the live queue: waiting on the
+        # shared queue would never finish under steady traffic. The file is removed once
+        # every batch has committed or been re-spooled; replaying a record twice is harmless.
+        replaying = self.spool_path.with_name(self.spool_path.name + ".replaying")
+        if self.spool_path.exists():
+            with replaying.open("a", encoding="utf-8") as out, self.spool_path.open(encoding="utf-8") as f:
+                out.write(f.read())
+            self.spool_path.unlink()
+        if not replaying.exists():
+            return
+        with replaying.open(encoding="utf-8") as f:
+            records = [SequenceRecord.from_json(line) for line in f if line.strip()]
+        logger.info("Replaying %d spooled write-behind records", len(records))
+        for i in range(0, len(records), self.batch_size):
+            await self._flush_with_retry(records[i:i + self.batch_size])
+        replaying.unlink(missing_ok=True)
+
+write_behind = WriteBehindWriter.from_settings()
@@ -0,0 +1,61 @@
+"""
+Per-model token prices for cost accounting.
+
+Prices are USD per 1M tokens (input, output), from the providers' public price lists.
+Override or extend them without a deploy via PRICING_OVERRIDES, keyed by provider:model,
+e.g. PRICING_OVERRIDES='{"openai:gpt-4o": [2.5, 10.0]}' (shape checked in Settings). A
+model with no price gets no cost estimate (None) rather than a guess.
+"""
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per provider, so a route naming a model on the wrong provider (groq:gpt-4o) is caught.
+MODEL_PRICING: dict[str, dict[str, tuple[float, float]]] = {
+    "openai": {
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4o": (2.50, 10.00),
+        "gpt-4.1": (2.00, 8.00),
+        "gpt-4.1-mini": (0.40, 1.60),
+        "gpt-4.1-nano": (0.10, 0.40),
+    },
+    "groq": {
+        "llama-3.3-70b-versatile": (0.59, 0.79),
+        "llama-3.1-8b-instant": (0.05, 0.08),
+        "openai/gpt-oss-20b": (0.10, 0.50),
+        "openai/gpt-oss-120b": (0.15, 0.75),
+    },
+}
+
+_warned: set[str] = set()
+
+
+def price_for(provider: str, model: str) -> tuple[float, float] | None:
+    """(input, output) USD per 1M tokens for `model` on `provider`, or None if unknown."""
+    price = settings.pricing_overrides.get(f"{provider}:{model}") or MODEL_PRICING.get(provider, {}).get(model)
+    return tuple(price) if price else None
+
+
+def is_priced(provider: str, model: str) -> bool:
+    return price_for(provider, model) is not None
+
+
+def providers_listing(model: str) -> set[str]:
+    """Providers whose price list (built-in or overrides) has `model`."""
+    listed = {provider for provider, models in MODEL_PRICING.items() if model in models}
+    listed.update(key.partition(":")[0] for key in settings.pricing_overrides if key.partition(":")[2] == model)
+    return listed
+
+
+def estimate_cost(provider: str, model: str, input_tokens: int, output_tokens: int) -> float | None:
+    price = price_for(provider, model)
+    if price is None:
+        key = f"{provider}:{model}"
+        if key not in _warned:
+            _warned.add(key)
+            logger.warning("No pricing for model %r; cost_estimate will be empty", key)
+        return None
+    input_price, output_price = price
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
@@ -0,0 +1,157 @@
+"""
+Ranked search over generated messages: full-text (tsvector GIN) plus trigram (pg_trgm GIN)
+matching on message content and the sequence's company context (company_contexts).
+"""
+from datetime import datetime
+
+from sqlalchemy import Text, and_, func, literal, literal_column, or_, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import CompanyContext, MessageSequence, Prospect, SequenceMessage
+from app.schemas.search import MessageSearchResponse, MessageSearchResult
+from app.services.generate import _normalize_linkedin_url
+
+# Inlined rather than bound so PostgreSQL sees a regconfig, as in the generated columns.
+TS_CONFIG = literal_column("'english'::regconfig")
+# Context hits rank below hits in the message itself.
+CONTEXT_RANK_WEIGHT = 0.5
+HEADLINE_OPTIONS = "MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+class MessageSearchService:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def search(
+        self,
+        q: str,
+        prospect_id: str | None = None,
+        prospect_url: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        min_confidence: float | None = None,
+        max_confidence: float | None = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> MessageSearchResponse:
+        q = q.strip()
+        tsquery = func.websearch_to_tsquery(TS_CONFIG, q)
+        term = literal(q, type_=Text)
+
+        # Candidate set: a UNION of branches that each scan a single table, so each branch's
+        # OR of @@ / <% is a BitmapOr of that table's two GIN indexes. PostgreSQL cannot
+        # BitmapOr predicates on different tables of a join, so ORing message and context
+        # matches after the join would scan every message in range. Joins, ranking and
+        # pagination then run over the candidates only.
+        message_bounds, sequence_bounds = [], []
+        # Bounds on each table's partition key so every branch scans only the months in range.
+        if created_from:
+            message_bounds.append(SequenceMessage.sequence_created_at >= created_from)
+            sequence_bounds.append(MessageSequence.created_at >= created_from)
+        if created_to:
+            message_bounds.append(SequenceMessage.sequence_created_at < created_to)
+            sequence_bounds.append(MessageSequence.created_at < created_to)
+
+        message_hits = select(SequenceMessage.id, SequenceMessage.sequence_created_at).where(
+            or_(
+                SequenceMessage.content_tsv.bool_op("@@")(tsquery),
+                term.bool_op("<%")(SequenceMessage.content),
+            ),
+            *message_bounds,
+        )
+        # Context hits -> their sequences (ix_message_sequences_context_created) -> messages
+        # (uq_sequence_message_step).
+        context_hits = select(CompanyContext.id).where(
+            or_(
+                CompanyContext.content_tsv.bool_op("@@")(tsquery),
+                term.bool_op("<%")(CompanyContext.content),
+            )
+        )
+        context_messages = (
+            select(SequenceMessage.id, SequenceMessage.sequence_created_at)
+            .join(
+                MessageSequence,
+                and_(
+                    MessageSequence.id == SequenceMessage.sequence_id,
+                    MessageSequence.created_at == SequenceMessage.sequence_created_at,
+                ),
+            )
+            .where(MessageSequence.context_id.in_(context_hits), *sequence_bounds, *message_bounds)
+        )
+        candidates = union(message_hits, context_messages).subquery("candidates")
+
+        rank = (
+            func.ts_rank_cd(SequenceMessage.content_tsv, tsquery)
+            + CONTEXT_RANK_WEIGHT * func.ts_rank_cd(CompanyContext.content_tsv, tsquery)
+            + func.word_similarity(term, SequenceMessage.content)
+        ).label("rank")
+
+        filters = list(message_bounds)
+        if prospect_id:
+            filters.append(MessageSequence.prospect_id == prospect_id)
+        if prospect_url:
+            filters.append(Prospect.linkedin_url == _normalize_linkedin_url(prospect_url))
+        if min_confidence is not None:
+            filters.append(SequenceMessage.confidence_score >= min_confidence)
+        if max_confidence is not None:
+            filters.append(SequenceMessage.confidence_score <= max_confidence)
+
+        stmt = (
+            select(
+                SequenceMessage.id,
+                SequenceMessage.sequence_id,
+                SequenceMessage.step_number,
+                SequenceMessage.content,
+                SequenceMessage.confidence_score,
+                SequenceMessage.sequence_created_at,
+                MessageSequence.prospect_id,
+                Prospect.linkedin_url,
+                rank,
+                func.ts_headline(TS_CONFIG, SequenceMessage.content, tsquery, HEADLINE_OPTIONS).label("highlight"),
+            )
+            .select_from(candidates)
+            .join(
+                SequenceMessage,
+                and_(
+                    SequenceMessage.id == candidates.c.id,
+                    SequenceMessage.sequence_created_at == candidates.c.sequence_created_at,
+                ),
+            )
+            .join(
+                MessageSequence,
+                and_(
+                    MessageSequence.id == SequenceMessage.sequence_id,
+                    MessageSequence.created_at == SequenceMessage.sequence_created_at,
+                ),
+            )
+            .join(CompanyContext, CompanyContext.id == MessageSequence.context_id)
+            .join(Prospect, Prospect.id == MessageSequence.prospect_id)
+            .where(*filters)
+            .order_by(rank.desc(), SequenceMessage.sequence_created_at.desc(), SequenceMessage.id)
+            .limit(limit + 1)  # one extra row tells us whether there is a next page
+            .offset(offset)
+        )
+        rows = (await self.session.execute(stmt)).all()
+
+        results = [
+            MessageSearchResult(
+                message_id=row.id,
+                sequence_id=row.sequence_id,
+                prospect_id=row.prospect_id,
+                prospect_url=row.linkedin_url,
+                step=row.step_number,
+                content=row.content,
+                highlight=row.highlight,
+                confidence_score=row.confidence_score,
+                created_at=row.sequence_created_at,
+                rank=float(row.rank or 0.0),
+            )
+            for row in rows[:limit]
+        ]
+        return MessageSearchResponse(
+            query=q,
+            results=results,
+            limit=limit,
+            offset=offset,
+            has_more=len(rows) > limit,
+        )
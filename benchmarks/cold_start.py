@@ -0,0 +1,115 @@
+"""
+Cold-start benchmark: import time of the app and time-to-first-request of a fresh server.
+
+    python benchmarks/cold_start.py [--runs 5] [--ready-timeout 0]
+
+- import: wall time of `python -c "import main"` in a fresh interpreter (median of N runs),
+  plus the slowest top-level imports from `python -X importtime`.
+- first request: spawn `uvicorn main:app` through docker-entrypoint.sh, as the container
+  does (so RUN_MIGRATIONS=1 in the environment includes the upgrade), and poll
+  /health/live until it answers 200.
+- ready (optional, needs a migrated database): keep polling /health/ready until 200.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time(runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, check=True, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def slowest_imports(top: int = 8) -> list[tuple[int, str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, capture_output=True, text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only modules imported directly by main (one level of indentation in the tree).
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def first_request(ready_timeout: float) -> tuple[float, float | None]:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        ["sh", "docker-entrypoint.sh", sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    live = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while live is None:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before serving a request")
+                try:
+                    if client.get("/health/live").status_code == 200:
+                        live = time.perf_counter() - start
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            deadline = time.perf_counter() + ready_timeout
+            while ready_timeout and time.perf_counter() < deadline:
+                if client.get("/health/ready").status_code == 200:
+                    ready = time.perf_counter() - start
+                    break
+                time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return live, ready
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ready-timeout", type=float, default=0.0, help="seconds to wait for /health/ready (0 = skip)")
+    args = parser.parse_args()
+
+    print(f"RUN_MIGRATIONS={os.environ.get('RUN_MIGRATIONS', '0')}")
+    print(f"import main (median of {args.runs}):  {import_time(args.runs) * 1000:8.1f} ms")
+    print("slowest imports (cumulative):")
+    for micros, name in slowest_imports():
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+    live_samples, ready_samples = [], []
+    for _ in range(args.runs):
+        live, ready = first_request(args.ready_timeout)
+        live_samples.append(live)
+        if ready is not None:
+            ready_samples.append(ready)
+    print(f"time to first request (median):     {statistics.median(live_samples) * 1000:8.1f} ms")
+    if ready_samples:
+        print(f"time to ready (median):             {statistics.median(ready_samples) * 1000:8.1f} ms")
+    elif args.ready_timeout:
+        print("time to ready:                      not reached (is the database migrated and reachable?)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+JSON microbenchmarks: stdlib json vs the orjson fast path, on realistic payloads.
+
+    python benchmarks/json_codecs.py [--messages 5] [--repeat 7]
+
+- jsonb encode / decode: what happens per JSONB value on an asyncpg connection. The
+  baseline is SQLAlchemy's default (json.dumps -> str.encode, bytes.decode -> json.loads);
+  the fast path is app.db.codecs.
+- response path: what FastAPI does with the GenerateSequenceResponse the route returns:
+  serialize_response (validate against response_model, dump in JSON mode) then the
+  response class renders it; JSONResponse vs the router's ORJSONResponse. Only the render
+  step differs, so this is the end-to-end gain, not just json.dumps vs orjson.dumps.
+- parse model output: the previous line-splitting _parse_json_from_content with json.loads
+  vs the current one, on a fenced completion.
+
+Payloads are shaped like production data: a prospect profile_data blob, per-message
+thinking_process, a TOV snapshot, and the full API response for N messages.
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+from app.api.routes import router  # noqa: E402
+from app.db.codecs import _decode_jsonb, _encode_jsonb, dumps  # noqa: E402
+from app.schemas.generate import GenerateSequenceResponse  # noqa: E402
+from app.services.ai import _parse_json_from_content  # noqa: E402
+
+PROFILE_DATA = {
+    "summary": (
+        "VP of Revenue Operations at a Series C B2B SaaS company (~400 employees) selling "
+        "workflow automation to mid-market finance teams. Recently posted about consolidating "
+        "the sales tech stack and moving forecasting out of spreadsheets; previously led "
+        "RevOps at two high-growth startups through their Series B and C."
+    ),
+    "role_or_industry": "Revenue Operations, B2B SaaS (FinTech / workflow automation)",
+    "signals": [
+        "Owns the GTM tooling budget",
+        "Publicly frustrated with spreadsheet forecasting",
+        "Team grew from 4 to 11 in the last year",
+        "Evaluating CRM consolidation this quarter",
+        "Speaks at RevOps community events",
+    ],
+    "raw_data": {
+        "headline": "VP Revenue Operations | Building predictable revenue engines",
+        "location": "Austin, Texas, United States",
+        "experience": [
+            {"title": "VP Revenue Operations", "company": "Ledgerly", "years": 2},
+            {"title": "Director, RevOps", "company": "Pipewise", "years": 3},
+            {"title": "Sales Operations Manager", "company": "Brightdesk", "years": 2},
+        ],
+        "skills": ["Salesforce", "HubSpot", "Forecasting", "Territory planning", "SQL"],
+    },
+}
+
+TOV_CONFIG = {"formality": 0.6, "warmth": 0.7, "directness": 0.4}
+
+THINKING = {
+    "reasoning": (
+        "Opens with their recent post on forecasting to show relevance, ties our pipeline "
+        "analytics to the consolidation project they mentioned, and ends with a low-friction "
+        "question instead of a meeting ask because this is the first touch."
+    )
+}
+
+
+def message(step: int) -> dict:
+    return {
+        "step": step,
+        "content": (
+            "Hi Dana, your post about retiring the forecasting spreadsheet resonated. We help "
+            "RevOps teams like Ledgerly's get a single pipeline view across CRMs without a "
+            f"migration project. Curious how you're approaching the consolidation? (step {step})"
+        ),
+        "thinking_process": THINKING,
+        "confidence_score": 0.82,
+    }
+
+
+def response_payload(messages: int) -> GenerateSequenceResponse:
+    body = {
+        "sequence_id": "3f1c2a9e-6b7d-4e51-9a0c-8d2e4f6a1b3c",
+        "context_id": "9b74c9897bac770ffc029102a200c5de" * 2,
+        "prospect_analysis": {k: PROFILE_DATA[k] for k in ("summary", "role_or_industry", "signals", "raw_data")},
+        "messages": [message(i + 1) for i in range(messages)],
+        "thinking_process_summary": "Lead with their forecasting pain, then social proof, then a soft ask.",
+        "model_used": "llama-3.3-70b-versatile",
+        "token_usage": {"input_tokens": 2841, "output_tokens": 1377, "cost_estimate_usd": 0.0027},
+    }
+    return GenerateSequenceResponse.model_validate(body)
+
+
+def completion(messages: int) -> str:
+    data = {"thinking_summary": "Lead with their forecasting pain.", "messages": [message(i + 1) for i in range(messages)]}
+    return "```json\n" + json.dumps(data, indent=2) + "\n```"
+
+
+# Baselines: SQLAlchemy asyncpg dialect defaults and the previous parser.
+def _stdlib_encode_jsonb(value) -> bytes:
+    return b"\x01" + json.dumps(value).encode()
+
+
+def _stdlib_decode_jsonb(data: bytes):
+    return json.loads(data[1:].decode())
+
+
+def _parse_json_lines(content: str) -> dict:
+    text = content.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        if lines[0].startswith("```"):
+            lines = lines[1:]
+        if lines and lines[-1].strip() == "```":
+            lines = lines[:-1]
+        text = "\n".join(lines)
+    return json.loads(text)
+
+
+def response_path(field, model: GenerateSequenceResponse, response_class) -> bytes:
+    """serialize_response + render, as the route runs them for `model`."""
+    # With is_coroutine=True serialize_response never suspends, so step it to completion
+    # here instead of timing an event loop round trip on every call.
+    coro = serialize_response(field=field, response_content=model, is_coroutine=True)
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return response_class(done.value).body
+    raise RuntimeError("serialize_response suspended")
+
+
+def bench(fn, repeat: int) -> float:
+    """Best-of-`repeat` microseconds per call."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=5, help="messages per sequence in the payloads")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    model = response_payload(args.messages)
+    field = next(route for route in router.routes if route.path == "/api/generate-sequence").response_field
+    content = completion(args.messages)
+    profile_bytes = _stdlib_encode_jsonb(PROFILE_DATA)
+
+    cases = [
+        (
+            "jsonb encode profile_data",
+            lambda: _stdlib_encode_jsonb(PROFILE_DATA),
+            lambda: _encode_jsonb(dumps(PROFILE_DATA)),
+        ),
+        (
+            "jsonb encode tov_config",
+            lambda: _stdlib_encode_jsonb(TOV_CONFIG),
+            lambda: _encode_jsonb(dumps(TOV_CONFIG)),
+        ),
+        (
+            "jsonb encode thinking_process",
+            lambda: _stdlib_encode_jsonb(THINKING),
+            lambda: _encode_jsonb(dumps(THINKING)),
+        ),
+        (
+            "jsonb decode profile_data",
+            lambda: _stdlib_decode_jsonb(profile_bytes),
+            lambda: _decode_jsonb(profile_bytes),
+        ),
+        (
+            f"response path ({args.messages} messages)",
+            lambda: response_path(field, model, JSONResponse),
+            lambda: response_path(field, model, ORJSONResponse),
+        ),
+        (
+            f"parse model output ({args.messages} messages)",
+            lambda: _parse_json_lines(content),
+            lambda: _parse_json_from_content(content),
+        ),
+    ]
+
+    # Same results on both paths before timing them.
+    assert _decode_jsonb(_encode_jsonb(dumps(PROFILE_DATA))) == _stdlib_decode_jsonb(profile_bytes) == PROFILE_DATA
+    assert _parse_json_from_content(content) == _parse_json_lines(content)
+    assert json.loads(response_path(field, model, ORJSONResponse)) == json.loads(response_path(field, model, JSONResponse))
+
+    print(f"{'case':<36} {'stdlib µs':>10} {'orjson µs':>10} {'speedup':>8}")
+    for name, baseline, fast in cases:
+        slow_us, fast_us = bench(baseline, args.repeat), bench(fast, args.repeat)
+        print(f"{name:<36} {slow_us:>10.2f} {fast_us:>10.2f} {slow_us / fast_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
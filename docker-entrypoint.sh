@@ -0,0 +1,13 @@
+#!/bin/sh
+# Start the server, optionally bringing the schema to the expected Alembic revision first.
+# Migrations normally run once as a release step, so new pods start without alembic's
+# imports and round trips; the app stays unready (/health/ready) until they have run.
+# RUN_MIGRATIONS=1 runs them here, e.g. for a single instance; concurrent
+# upgrades are serialized by an advisory lock in migrations/env.py.
+set -e
+
+if [ "${RUN_MIGRATIONS:-0}" = "1" ]; then
+    alembic upgrade head
+fi
+
+exec "$@"
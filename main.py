@@ -1,50 +1,64 @@
+import asyncio
+import logging
+import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+# Before the app imports: app.config logs while Settings load at import time.
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
-from app.api.routes import router
-from app.db import init_db
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from sqlalchemy import text  # noqa: E402
 
-# Ensure all models are registered with Base.metadata before create_all
-from app import models  # noqa: F401
+from app.api.routes import router  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.db import SchemaMismatch, check_schema, get_engine  # noqa: E402
+from app.services.admission import admission  # noqa: E402
+from app.services.ai import check_routes  # noqa: E402
+from app.services.persistence import write_behind  # noqa: E402
+
+logger = logging.getLogger("valley")
+
+
+async def wait_for_schema(app: FastAPI) -> None:
+    """
+    Poll until the database is reachable and at the expected Alembic revision, then mark
+    the app ready. Runs in the background so the process serves liveness immediately;
+    readiness stays 503 until this succeeds.
+    """
+    while True:
+        try:
+            revision = await asyncio.wait_for(check_schema(), settings.schema_check_timeout_seconds)
+            app.state.ready = True
+            logger.info("Database schema OK (revision %s); ready for traffic", revision)
+            return
+        except SchemaMismatch as e:
+            logger.error("%s", e)
+        except Exception as e:
+            logger.warning("Database not reachable yet: %s", str(e)[:200])
+        await asyncio.sleep(settings.schema_check_retry_seconds)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Log startup info
-    import os
-    print("=" * 60)
-    print("Application starting up...")
-    print(f"Environment: {'Railway' if os.getenv('RAILWAY_ENVIRONMENT') else 'Local'}")
-    
-    # Check if DATABASE_URL is set
-    db_url_env = os.getenv("DATABASE_URL")
-    if db_url_env:
-        print(f"✓ DATABASE_URL found in environment")
-    else:
-        print("⚠ DATABASE_URL NOT found in environment variables!")
-        print("  Please ensure PostgreSQL service is added and linked in Railway")
-    
-    # Try to initialize DB
-    try:
-        await init_db()
-        print("✓ Database initialized successfully")
-    except Exception as e:
-        print(f"✗ Database initialization failed: {e}")
-        print("\nTROUBLESHOOTING:")
-        print("1. In Railway dashboard, check if PostgreSQL service exists")
-        print("2. Ensure PostgreSQL service is linked to your app service")
-        print("3. Check Variables tab - DATABASE_URL should be auto-set by Railway")
-        print("4. Verify PostgreSQL service is running (not paused)")
-        raise  # Fail startup so Railway shows the error
-    
-    print("=" * 60)
-    
+    logger.info(
+        "Application starting up (environment: %s)",
+        "Railway" if os.getenv("RAILWAY_ENVIRONMENT") else "Local",
+    )
+    # Misconfigured model routes fail the boot, not the first paid generation.
+    routes = check_routes()
+    logger.info("Model routes: %s", ", ".join(f"{stage}={route}" for stage, route in routes.items()))
+    app.state.ready = False
+    schema_task = asyncio.create_task(wait_for_schema(app))
+    if settings.persistence_mode == "write_behind":
+        await write_behind.start()
+
     yield
-    # shutdown: close engine if needed
-    from app.db.session import get_engine
-    engine = get_engine()
-    await engine.dispose()
+
+    schema_task.cancel()
+    # Flush queued write-behind records before the engine goes away.
+    await write_behind.stop()
+    await get_engine().dispose()
 
 
 app = FastAPI(
@@ -57,5 +71,24 @@ app.include_router(router)
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def health():
+    """Liveness: the process is up and serving. Never touches the database."""
     return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def ready():
+    """
+    Readiness: schema verified at startup and the database answers right now.
+    Overload is handled by admission control (503 on /api/generate-sequence), not here, so
+    a busy pod is not pulled out of rotation; the admission stats are included for visibility.
+    """
+    if not app.state.ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    try:
+        async with get_engine().connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=2.0)
+    except Exception:
+        return JSONResponse({"status": "database unavailable"}, status_code=503)
+    return {"status": "ready", "admission": admission.stats(), "write_behind": write_behind.stats()}
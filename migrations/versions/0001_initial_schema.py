@@ -0,0 +1,90 @@
+"""initial schema (tables as created by create_all before migrations existed)
+
+Databases created by the old create_all startup path already have this schema:
+stamp them with `alembic stamp 0001` before running `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "prospects",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("linkedin_url", sa.String(512), nullable=False),
+        sa.Column("profile_data", postgresql.JSONB(), nullable=True),
+        sa.Column("analyzed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_prospects_linkedin_url", "prospects", ["linkedin_url"], unique=True)
+
+    op.create_table(
+        "tov_configs",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("name", sa.String(128), nullable=False),
+        sa.Column("formality", sa.Float(), nullable=False),
+        sa.Column("warmth", sa.Float(), nullable=False),
+        sa.Column("directness", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+    op.create_table(
+        "message_sequences",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("prospect_id", sa.String(36), sa.ForeignKey("prospects.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("tov_config", postgresql.JSONB(), nullable=False),
+        sa.Column("company_context", sa.Text(), nullable=False),
+        sa.Column("sequence_length", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_message_sequences_prospect_created", "message_sequences", ["prospect_id", "created_at"])
+
+    op.create_table(
+        "sequence_messages",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column(
+            "sequence_id", sa.String(36), sa.ForeignKey("message_sequences.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("step_number", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("thinking_process", postgresql.JSONB(), nullable=True),
+        sa.Column("confidence_score", sa.Float(), nullable=True),
+        sa.UniqueConstraint("sequence_id", "step_number", name="uq_sequence_message_step"),
+    )
+
+    op.create_table(
+        "ai_generations",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column(
+            "sequence_id", sa.String(36), sa.ForeignKey("message_sequences.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("model_used", sa.String(64), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False),
+        sa.Column("output_tokens", sa.Integer(), nullable=False),
+        sa.Column("cost_estimate", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ai_generations")
+    op.drop_table("sequence_messages")
+    op.drop_index("ix_message_sequences_prospect_created", table_name="message_sequences")
+    op.drop_table("message_sequences")
+    op.drop_table("tov_configs")
+    op.drop_index("ix_prospects_linkedin_url", table_name="prospects")
+    op.drop_table("prospects")
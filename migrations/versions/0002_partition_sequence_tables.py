@@ -0,0 +1,205 @@
+"""monthly range partitioning for message_sequences, sequence_messages, ai_generations
+
+message_sequences is partitioned on created_at. sequence_messages and ai_generations get a
+sequence_created_at column (copied from the parent) and are partitioned on it, so all three
+tables share bounds and a month can be detached as a unit (app/db/partitions.py).
+
+The existing rows are copied into the partitioned tables and the old tables are dropped.
+This rewrites every row once; run it in a maintenance window on large databases.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("message_sequences", "sequence_messages", "ai_generations")
+PREMAKE_MONTHS = 2
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + (month.month - 1) + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_month_partitions(month: date) -> None:
+    upper = _add_months(month, 1)
+    for table in TABLES:
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_y{month.year:04d}m{month.month:02d} "
+            f"PARTITION OF {table} FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+            f"TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+
+
+def _rename_to_legacy() -> None:
+    # Index-backed constraint names are schema-wide, so they move out of the way too.
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        op.execute(f"ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey TO {table}_legacy_pkey")
+    op.execute("ALTER TABLE sequence_messages_legacy RENAME CONSTRAINT uq_sequence_message_step TO uq_sequence_message_step_legacy")
+    op.execute("ALTER INDEX ix_message_sequences_prospect_created RENAME TO ix_message_sequences_prospect_created_legacy")
+
+
+def upgrade() -> None:
+    _rename_to_legacy()
+
+    op.create_table(
+        "message_sequences",
+        sa.Column("id", sa.String(36), nullable=False),
+        sa.Column("prospect_id", sa.String(36), sa.ForeignKey("prospects.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("tov_config", postgresql.JSONB(), nullable=False),
+        sa.Column("company_context", sa.Text(), nullable=False),
+        sa.Column("sequence_length", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index("ix_message_sequences_prospect_created", "message_sequences", ["prospect_id", "created_at"])
+
+    op.create_table(
+        "sequence_messages",
+        sa.Column("id", sa.String(36), nullable=False),
+        sa.Column("sequence_id", sa.String(36), nullable=False),
+        sa.Column("sequence_created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("step_number", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("thinking_process", postgresql.JSONB(), nullable=True),
+        sa.Column("confidence_score", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id", "sequence_created_at"),
+        sa.ForeignKeyConstraint(
+            ["sequence_id", "sequence_created_at"],
+            ["message_sequences.id", "message_sequences.created_at"],
+            ondelete="CASCADE",
+        ),
+        sa.UniqueConstraint("sequence_id", "sequence_created_at", "step_number", name="uq_sequence_message_step"),
+        postgresql_partition_by="RANGE (sequence_created_at)",
+    )
+
+    op.create_table(
+        "ai_generations",
+        sa.Column("id", sa.String(36), nullable=False),
+        sa.Column("sequence_id", sa.String(36), nullable=False),
+        sa.Column("sequence_created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("model_used", sa.String(64), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False),
+        sa.Column("output_tokens", sa.Integer(), nullable=False),
+        sa.Column("cost_estimate", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id", "sequence_created_at"),
+        sa.ForeignKeyConstraint(
+            ["sequence_id", "sequence_created_at"],
+            ["message_sequences.id", "message_sequences.created_at"],
+            ondelete="CASCADE",
+        ),
+        postgresql_partition_by="RANGE (sequence_created_at)",
+    )
+    op.create_index("ix_ai_generations_sequence", "ai_generations", ["sequence_id"])
+
+    # Partitions covering every month that has data, plus the premade future months.
+    oldest = op.get_bind().scalar(sa.text("SELECT min(created_at) FROM message_sequences_legacy"))
+    now = datetime.now(timezone.utc)
+    month = date((oldest or now).year, (oldest or now).month, 1)
+    last = _add_months(date(now.year, now.month, 1), PREMAKE_MONTHS)
+    while month <= last:
+        _create_month_partitions(month)
+        month = _add_months(month, 1)
+
+    op.execute(
+        "INSERT INTO message_sequences (id, prospect_id, tov_config, company_context, sequence_length, created_at) "
+        "SELECT id, prospect_id, tov_config, company_context, sequence_length, created_at "
+        "FROM message_sequences_legacy"
+    )
+    op.execute(
+        "INSERT INTO sequence_messages "
+        "(id, sequence_id, sequence_created_at, step_number, content, thinking_process, confidence_score) "
+        "SELECT m.id, m.sequence_id, s.created_at, m.step_number, m.content, m.thinking_process, m.confidence_score "
+        "FROM sequence_messages_legacy m JOIN message_sequences_legacy s ON s.id = m.sequence_id"
+    )
+    op.execute(
+        "INSERT INTO ai_generations "
+        "(id, sequence_id, sequence_created_at, model_used, input_tokens, output_tokens, cost_estimate, created_at) "
+        "SELECT g.id, g.sequence_id, s.created_at, g.model_used, g.input_tokens, g.output_tokens, "
+        "g.cost_estimate, g.created_at "
+        "FROM ai_generations_legacy g JOIN message_sequences_legacy s ON s.id = g.sequence_id"
+    )
+
+    op.drop_table("ai_generations_legacy")
+    op.drop_table("sequence_messages_legacy")
+    op.drop_table("message_sequences_legacy")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+        op.execute(f"ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey")
+    op.execute(
+        "ALTER TABLE sequence_messages_partitioned "
+        "RENAME CONSTRAINT uq_sequence_message_step TO uq_sequence_message_step_partitioned"
+    )
+    op.execute("ALTER INDEX ix_message_sequences_prospect_created RENAME TO ix_message_sequences_prospect_created_partitioned")
+
+    op.create_table(
+        "message_sequences",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("prospect_id", sa.String(36), sa.ForeignKey("prospects.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("tov_config", postgresql.JSONB(), nullable=False),
+        sa.Column("company_context", sa.Text(), nullable=False),
+        sa.Column("sequence_length", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_message_sequences_prospect_created", "message_sequences", ["prospect_id", "created_at"])
+    op.create_table(
+        "sequence_messages",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column(
+            "sequence_id", sa.String(36), sa.ForeignKey("message_sequences.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("step_number", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("thinking_process", postgresql.JSONB(), nullable=True),
+        sa.Column("confidence_score", sa.Float(), nullable=True),
+        sa.UniqueConstraint("sequence_id", "step_number", name="uq_sequence_message_step"),
+    )
+    op.create_table(
+        "ai_generations",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column(
+            "sequence_id", sa.String(36), sa.ForeignKey("message_sequences.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("model_used", sa.String(64), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False),
+        sa.Column("output_tokens", sa.Integer(), nullable=False),
+        sa.Column("cost_estimate", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+    op.execute(
+        "INSERT INTO message_sequences SELECT id, prospect_id, tov_config, company_context, sequence_length, created_at "
+        "FROM message_sequences_partitioned"
+    )
+    op.execute(
+        "INSERT INTO sequence_messages SELECT id, sequence_id, step_number, content, thinking_process, confidence_score "
+        "FROM sequence_messages_partitioned"
+    )
+    op.execute(
+        "INSERT INTO ai_generations SELECT id, sequence_id, model_used, input_tokens, output_tokens, cost_estimate, "
+        "created_at FROM ai_generations_partitioned"
+    )
+
+    # Dropping a partitioned table drops its partitions.
+    op.drop_table("ai_generations_partitioned")
+    op.drop_table("sequence_messages_partitioned")
+    op.drop_table("message_sequences_partitioned")
@@ -0,0 +1,49 @@
+"""full-text and trigram search indexes on message content and company context
+
+Adds generated tsvector columns (maintained by PostgreSQL on insert) with GIN indexes, and
+pg_trgm GIN indexes for fuzzy / substring matching. Adding a stored generated column
+rewrites every partition, and the index builds lock writes while they run.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.execute(
+        "ALTER TABLE sequence_messages ADD COLUMN content_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', content)) STORED NOT NULL"
+    )
+    op.execute("CREATE INDEX ix_sequence_messages_content_tsv ON sequence_messages USING gin (content_tsv)")
+    op.execute("CREATE INDEX ix_sequence_messages_content_trgm ON sequence_messages USING gin (content gin_trgm_ops)")
+
+    op.execute(
+        "ALTER TABLE message_sequences ADD COLUMN context_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', company_context)) STORED NOT NULL"
+    )
+    op.execute("CREATE INDEX ix_message_sequences_context_tsv ON message_sequences USING gin (context_tsv)")
+    op.execute(
+        "CREATE INDEX ix_message_sequences_context_trgm ON message_sequences USING gin (company_context gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_message_sequences_context_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_message_sequences_context_tsv")
+    op.execute("ALTER TABLE message_sequences DROP COLUMN context_tsv")
+    op.execute("DROP INDEX IF EXISTS ix_sequence_messages_content_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_sequence_messages_content_tsv")
+    op.execute("ALTER TABLE sequence_messages DROP COLUMN content_tsv")
@@ -0,0 +1,93 @@
+"""content-addressed company_contexts; sequences reference contexts by hash
+
+Each distinct company_context text is stored once in company_contexts, keyed by the hex
+SHA-256 of its UTF-8 bytes (same as app.models.context_hash). message_sequences gets
+context_id, is backfilled, and loses company_context and its search column/indexes, which
+move to company_contexts. Finally VACUUM FULL rewrites message_sequences (and its TOAST)
+to give the space back; it holds an ACCESS EXCLUSIVE lock per partition while it runs.
+
+Partitions already moved to the archive schema keep their inline company_context.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONTEXT_HASH_SQL = "encode(sha256(convert_to({column}, 'UTF8')), 'hex')"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "company_contexts",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column(
+            "content_tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', content)", persisted=True),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+    # Backfill: one row per distinct text, first seen at its oldest sequence.
+    op.execute(
+        "INSERT INTO company_contexts (id, content, created_at) "
+        f"SELECT {CONTEXT_HASH_SQL.format(column='company_context')}, company_context, min(created_at) "
+        "FROM message_sequences GROUP BY company_context "
+        "ON CONFLICT (id) DO NOTHING"
+    )
+    op.execute("CREATE INDEX ix_company_contexts_content_tsv ON company_contexts USING gin (content_tsv)")
+    op.execute("CREATE INDEX ix_company_contexts_content_trgm ON company_contexts USING gin (content gin_trgm_ops)")
+
+    op.add_column("message_sequences", sa.Column("context_id", sa.String(64), nullable=True))
+    op.execute(f"UPDATE message_sequences SET context_id = {CONTEXT_HASH_SQL.format(column='company_context')}")
+    op.alter_column("message_sequences", "context_id", nullable=False)
+    op.create_foreign_key(
+        "message_sequences_context_id_fkey", "message_sequences", "company_contexts", ["context_id"], ["id"]
+    )
+    op.create_index("ix_message_sequences_context_created", "message_sequences", ["context_id", "created_at"])
+
+    op.execute("DROP INDEX IF EXISTS ix_message_sequences_context_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_message_sequences_context_tsv")
+    op.drop_column("message_sequences", "context_tsv")
+    op.drop_column("message_sequences", "company_context")
+
+    # Dropped columns only become free space after a rewrite; VACUUM cannot run inside
+    # the migration transaction.
+    with op.get_context().autocommit_block():
+        op.execute("VACUUM (FULL, ANALYZE) message_sequences")
+        op.execute("ANALYZE company_contexts")
+
+
+def downgrade() -> None:
+    op.add_column("message_sequences", sa.Column("company_context", sa.Text(), nullable=True))
+    op.execute(
+        "UPDATE message_sequences s SET company_context = c.content FROM company_contexts c WHERE c.id = s.context_id"
+    )
+    op.alter_column("message_sequences", "company_context", nullable=False)
+    op.execute(
+        "ALTER TABLE message_sequences ADD COLUMN context_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', company_context)) STORED NOT NULL"
+    )
+    op.execute("CREATE INDEX ix_message_sequences_context_tsv ON message_sequences USING gin (context_tsv)")
+    op.execute(
+        "CREATE INDEX ix_message_sequences_context_trgm ON message_sequences USING gin (company_context gin_trgm_ops)"
+    )
+
+    op.drop_index("ix_message_sequences_context_created", table_name="message_sequences")
+    op.drop_constraint("message_sequences_context_id_fkey", "message_sequences", type_="foreignkey")
+    op.drop_column("message_sequences", "context_id")
+    op.drop_table("company_contexts")
@@ -0,0 +1,31 @@
+"""per-stage model, tokens and cost on ai_generations
+
+Adds ai_generations.stage_usage (JSONB): one entry per stage (analysis / planning /
+generation) with provider, model, calls, input_tokens, output_tokens and cost_estimate.
+Nullable and not backfilled; older rows only have the totals, priced at gpt-4o-mini rates.
+Adding a nullable column without a default is a catalog-only change on every partition.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("ai_generations", sa.Column("stage_usage", postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("ai_generations", "stage_usage")